@@ -29,59 +29,67 @@ def ler_entrada(nome_do_arquivo):
 
         return dados #retorna a lista de 'dados' com i linhas e j colunas.
 
+#########
+#Faixas de média usadas no resumo da turma: (limite inferior, nome da faixa). A média 10 entra na última faixa.
+FAIXAS_MEDIA = [(0, "0 a 2"), (2, "2 a 4"), (4, "4 a 6"), (6, "6 a 8"), (8, "8 a 10")]
+
 #########
 #Função que verifica os alunos aprovados
+#Gera uma tupla (nome, média, situação) por aluno, conforme a lista é percorrida, sem alterar a lista 'notas'.
 def verifica_aprovados(notas):
-    numero_alunos = len(notas) #calcula a quantidade de linhas da lista 'notas'
-    for i in range(numero_alunos):
-        nome = notas[0] #recupera o nome do aluno que está na coluna [0] e na linha [i] da lista 'notas'
-        media = mediaN(notas[i][1:]) #chama a função 'mediaN' para calcular a média das notas do aluno que estão a partir da coluna [1] da lista 'notas'
+    for linha in notas: #laço FOR que percorre cada linha (aluno) da lista 'notas'
+        nome = linha[0] #recupera o nome do aluno que está na coluna [0] da linha
+        media = mediaN(linha[1:]) #chama a função 'mediaN' para calcular a média das notas do aluno que estão a partir da coluna [1]
         media = round(media, 1) #arredonda a média para uma casa decimal
-        notas[i].append(media) #adiciona a média do aluno na última coluna da lista 'notas'
         if media >= 7.0: #verifica se a média do aluno é maior ou igual a sete
-            notas[i].append("Aprovado") #adiciona a palavra 'Aprovado' na última coluna da lista 'notas'
+            yield nome, media, "Aprovado"
         else: #caso contrário:
-            notas[i].append("Reprovado") #adiciona a palavra 'Reprovado' na última coluna da lista 'notas'
-    return notas #retorna a lista 'notas' com as informações atualizadas.
+            yield nome, media, "Reprovado"
 
 #########
-#Função que escreve no arquivo de saída.
-def exporta_resultado(notas): #recebe como parâmetro de entrada a lista 'notas'
-    arquivo = open("resultado.txt", "w") #abre o arquivo de saída e o renomeia como sendo a variável arquivo.
-    numero_alunos = len(notas) #calcula a quantidade de linhas da lista 'notas', sendo que cada linha corresponde a um aluno.
-    for i in range(numero_alunos): #laço FOR que percorre cada linha da lista 'notas'
-        nome = notas[i][0] #recupera o nome do aluno que está na coluna [0] e na linha [i] da lista
-        situacao = notas[i][-1] #recupera a situação do aluno que está na última coluna [-1] e na linha [i] da lista notas
-        arquivo.write("O aluno " + nome + " foi " + situacao + "\n") #escreve no arquivo de saída a mensagem com o nome do aluno e sua situação
-    arquivo.close() #fecha o arquivo de saída
-
-def exporta_resultado_2(notas):
-    with open("resultado.txt", "w") as resultado2: #abre o arquivo de entrada e o renomeia como sendo a variável resultado_2.
-        numero_alunos = len(notas) #calcula a quantidade de linhas da lista notas
-        aprovados = 0 
-        reprovados = 0 
-
-        for i in range(numero_alunos):
-            situacao = notas[i][-1] #A função verifica_aprovados(notas) calcula a média e adiciona "Aprovado" ou "Reprovado" à lista notas, assim é possivel a recuperação da situação do aluno. 
-            if situacao == "Aprovado":
-                aprovados += 1
+#Função que escreve no arquivo de saída e calcula o resumo da turma.
+#Percorre os alunos uma única vez, com o arquivo de saída aberto uma única vez, e retorna um dicionário com:
+#aprovados, reprovados, media_geral (média das médias dos alunos) e faixas (quantidade de alunos em cada faixa de média).
+def exporta_resultado(notas, nome_do_arquivo="resultado.txt"): #recebe como parâmetro de entrada a lista 'notas'
+    resumo = {
+        "aprovados": 0,
+        "reprovados": 0,
+        "media_geral": 0.0,
+        "faixas": {nome_faixa: 0 for _, nome_faixa in FAIXAS_MEDIA}
+    }
+    soma_medias = 0.0
+    with open(nome_do_arquivo, "w") as arquivo: #abre o arquivo de saída e o renomeia como sendo a variável arquivo.
+        for nome, media, situacao in verifica_aprovados(notas): #laço FOR que percorre o resultado de cada aluno
+            arquivo.write("O aluno " + nome + " foi " + situacao + "\n") #escreve no arquivo de saída a mensagem com o nome do aluno e sua situação
+            if situacao == "Aprovado": #conta os aprovados e os reprovados no mesmo laço
+                resumo["aprovados"] += 1
             else:
-                reprovados += 1
+                resumo["reprovados"] += 1
+            soma_medias += media
+            for limite, nome_faixa in reversed(FAIXAS_MEDIA): #procura a faixa da média, começando pela mais alta
+                if media >= limite:
+                    resumo["faixas"][nome_faixa] += 1
+                    break
 
-    return [aprovados, reprovados] #retorna uma lista com a quantidade de alunos aprovados e reprovados.
+    numero_alunos = resumo["aprovados"] + resumo["reprovados"]
+    if numero_alunos > 0:
+        resumo["media_geral"] = round(soma_medias / numero_alunos, 2)
+    return resumo #retorna o dicionário com o resumo da turma.
+
+#########
+#Função que processa o arquivo de notas de uma turma inteira, usada pelo modo em lote (python/lote_notas.py).
+#Retorna o mesmo resumo da turma de 'exporta_resultado'.
+def processa_turma(arquivo_notas, arquivo_resultado):
+    return exporta_resultado(ler_entrada(arquivo_notas), arquivo_resultado)
 
 ##########################
 #O programa começa aqui
-notas = ler_entrada("notas.in") #Chama a função que lê o arquivo de entrada e armazena o valor retornado na variável 'notas'
-notas = verifica_aprovados(notas) #Chama a função que realiza a verificação e armazena o valor retornado na variável 'notas'
-aprovados = exporta_resultado_2(notas) #Chama a função que escreve o arquivo de saida e armazena o valor na varivel 'aprovados'
-exporta_resultado(notas) # Chama a função que exporta o resultado em um arquivo
-
-#Laço FOR que percorre cada linha da variável 'notas'
-for i in range(len(notas)): 
-  print(notas[i]) #imprime os valores de cada linha da variável 'notas'
-
-print("\nO número de aprovados é: ", aprovados[0])
-print("O número de reprovados é: ", aprovados[1])
-
+if __name__ == "__main__": #só roda quando o arquivo é executado, e não quando ele é importado
+    notas = ler_entrada("notas.in") #Chama a função que lê o arquivo de entrada e armazena o valor retornado na variável 'notas'
+    resumo = exporta_resultado(notas) #Chama a função que verifica os alunos, escreve o arquivo de saida e retorna o resumo da turma
 
+    print("O número de aprovados é: ", resumo["aprovados"])
+    print("O número de reprovados é: ", resumo["reprovados"])
+    print("A média da turma é: ", resumo["media_geral"])
+    for nome_faixa, quantidade in resumo["faixas"].items(): #Laço FOR que percorre cada faixa de média
+      print("Alunos com média entre " + nome_faixa + ": ", quantidade)
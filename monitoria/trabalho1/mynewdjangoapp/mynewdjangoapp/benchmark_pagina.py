@@ -0,0 +1,58 @@
+"""
+Benchmark da página inicial (/): requisições por segundo sem cache (template sem o loader com cache e página
+renderizada a cada requisição), com o cache da página e com GET condicional (o navegador já tem a página e recebe 304).
+
+As requisições passam por todos os middlewares, mas sem servidor HTTP (django.test.Client), então o número mostra só
+o custo do Django.
+
+Uso:
+   python3 benchmark_pagina.py
+   python3 benchmark_pagina.py --segundos 5
+"""
+import os, sys, time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mynewdjangoapp.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, override_settings
+
+def requisicoes_por_segundo(cliente:Client, segundos:float, **cabecalhos)->tuple[float, int]:
+   """
+   Faz GET em / repetidamente por segundos e devolve as requisições por segundo e o status da última resposta.
+   """
+   quantidade:int = 0
+   inicio:float = time.perf_counter()
+   fim:float = inicio + segundos
+   while time.perf_counter() < fim:
+      resposta = cliente.get("/", **cabecalhos)
+      quantidade += 1
+   return quantidade / (time.perf_counter() - inicio), resposta.status_code
+
+def templates_sem_cache()->list[dict]:
+   templates:list[dict] = [dict(engine, OPTIONS=dict(engine["OPTIONS"])) for engine in settings.TEMPLATES]
+   templates[0]["OPTIONS"]["loaders"] = [
+      'django.template.loaders.filesystem.Loader',
+      'django.template.loaders.app_directories.Loader',
+   ]
+   return templates
+
+if __name__ == "__main__":
+   segundos:float = float(sys.argv[sys.argv.index("--segundos") + 1]) if "--segundos" in sys.argv else 3
+   cliente = Client(HTTP_HOST="localhost")
+
+   with override_settings(TEMPLATES=templates_sem_cache(), PAGINA_INICIAL_CACHE_SEGUNDOS=0):
+      antes, status_antes = requisicoes_por_segundo(cliente, segundos)
+
+   cache.clear()
+   depois, status_depois = requisicoes_por_segundo(cliente, segundos)
+   etag:str = cliente.get("/")["ETag"]
+   condicional, status_condicional = requisicoes_por_segundo(cliente, segundos, HTTP_IF_NONE_MATCH=etag)
+
+   print(f"GET / ({segundos:g}s cada):")
+   print(f"   sem cache          {antes:>10.0f} req/s   (status {status_antes})")
+   print(f"   cache da página    {depois:>10.0f} req/s   (status {status_depois}, {depois / antes:.1f}x)")
+   print(f"   If-None-Match      {condicional:>10.0f} req/s   (status {status_condicional}, {condicional / antes:.1f}x)")
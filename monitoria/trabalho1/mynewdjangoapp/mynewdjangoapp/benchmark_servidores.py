@@ -0,0 +1,48 @@
+"""
+Teste de carga local: vazão (req/s) e latência p99 de / e /livroaleatorio servidos por WSGI (gunicorn, workers com
+threads) e por ASGI (uvicorn), com 50 a 500 conexões simultâneas.
+
+Os servidores são iniciados aqui mesmo, em portas livres, e o gerador de carga é o de mynewdjangoapp/carga.py (HTTP/1.1
+com keep-alive, feito com asyncio). Precisa do gunicorn e do uvicorn instalados e do banco migrado
+("python manage.py migrate"). Como o cliente roda na mesma máquina, ele divide a CPU com o servidor: os números servem
+para comparar os dois modos entre si, não como a capacidade real do servidor.
+
+Uso:
+   python3 benchmark_servidores.py
+   python3 benchmark_servidores.py --conexoes 50 500 --segundos 10 --workers 2
+"""
+import argparse, os, subprocess, sys
+from mynewdjangoapp.carga import carga, espera_servidor, porta_livre
+
+CAMINHOS:list[str] = ["/", "/livroaleatorio"]
+CONEXOES:list[int] = [50, 100, 250, 500]
+
+def comando_servidor(modo:str, porta:int, workers:int)->list[str]:
+   if modo == "wsgi":
+      return [sys.executable, "-m", "gunicorn", "mynewdjangoapp.wsgi:application", "--bind", f"127.0.0.1:{porta}",
+              "--workers", str(workers), "--worker-class", "gthread", "--threads", "8", "--backlog", "2048", "--log-level", "warning"]
+   return [sys.executable, "-m", "uvicorn", "mynewdjangoapp.asgi:application", "--host", "127.0.0.1", "--port", str(porta),
+           "--workers", str(workers), "--backlog", "2048", "--log-level", "warning", "--no-access-log"]
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Compara WSGI (gunicorn) e ASGI (uvicorn) com várias conexões simultâneas.")
+   parser.add_argument("--conexoes", type=int, nargs="+", default=CONEXOES)
+   parser.add_argument("--segundos", type=float, default=5)
+   parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos de cada servidor")
+   argumentos = parser.parse_args()
+
+   print(f"{'servidor':<6} {'caminho':<16} {'conexões':>8} {'req/s':>9} {'p99 (ms)':>9} {'erros':>6}")
+   for modo in ("wsgi", "asgi"):
+      porta:int = porta_livre()
+      processo = subprocess.Popen(comando_servidor(modo, porta, argumentos.workers), cwd=os.path.dirname(os.path.abspath(__file__)))
+      try:
+         espera_servidor(porta, processo)
+         for caminho in CAMINHOS:
+            carga(porta, caminho, 10, 1) #aquecimento: carrega templates, catálogo e cache da página
+            for num_conexoes in argumentos.conexoes:
+               resultado = carga(porta, caminho, num_conexoes, argumentos.segundos)
+               vazao:float = resultado.requisicoes / resultado.duracao
+               print(f"{modo:<6} {caminho:<16} {num_conexoes:>8} {vazao:>9.0f} {resultado.percentil(99) * 1000:>9.1f} {resultado.erros:>6}")
+      finally:
+         processo.terminate()
+         processo.wait()
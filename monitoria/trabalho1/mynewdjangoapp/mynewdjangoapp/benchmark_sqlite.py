@@ -0,0 +1,115 @@
+"""
+Teste de estresse do SQLite com várias threads: threads escrevendo (logins, que criam e atualizam sessões, e saves no
+estilo do admin, que leem e escrevem dentro de uma transação) ao mesmo tempo que threads lendo (sessões e livros).
+Roda com o perfil "simples" (SQLite padrão do Django) e com o de produção (WAL, conexões reaproveitadas e leituras na
+conexão somente leitura) e mostra as operações por segundo e os erros "database is locked" de cada um.
+
+Cada perfil roda num processo separado (o perfil é lido no settings) com um banco novo num diretório temporário.
+
+Uso:
+   python3 benchmark_sqlite.py
+   python3 benchmark_sqlite.py --escritores 8 --leitores 16 --segundos 10
+"""
+import argparse, json, os, random, shutil, subprocess, sys, tempfile, threading, time
+
+DIRETORIO:str = os.path.dirname(os.path.abspath(__file__))
+PERFIS:list[str] = ["simples", "producao"]
+
+def trabalho(escritores:int, leitores:int, segundos:float)->dict:
+   """
+   Roda as threads de escrita e leitura no processo atual (com o perfil do ambiente) e conta operações e erros.
+   """
+   import django
+   django.setup()
+   from django.contrib.sessions.backends.db import SessionStore
+   from django.db import OperationalError, connections, transaction
+   from mynewdjangoapp.models import Livro
+
+   contagens:dict[str,int] = {"escritas": 0, "leituras": 0, "travado": 0}
+   trava = threading.Lock()
+   chaves:list[str] = []
+   fim:float = time.perf_counter() + segundos
+
+   def conta(chave:str)->None:
+      with trava:
+         contagens[chave] += 1
+
+   def escritor(numero:int)->None:
+      gerador = random.Random(numero)
+      while time.perf_counter() < fim:
+         try:
+            if gerador.random() < 0.7:
+               sessao = SessionStore() #login: cria a sessão e atualiza depois
+               sessao["_auth_user_id"] = str(numero)
+               sessao.create()
+               sessao["visitas"] = 1
+               sessao.save()
+               chaves.append(sessao.session_key)
+            else:
+               with transaction.atomic(): #save do admin: lê e escreve na mesma transação
+                  quantidade:int = Livro.objects.count()
+                  Livro.objects.create(titulo=f"Livro {quantidade}", descricao="estresse")
+            conta("escritas")
+         except OperationalError as erro:
+            if "locked" not in str(erro):
+               raise
+            conta("travado")
+      connections.close_all()
+
+   def leitor(numero:int)->None:
+      gerador = random.Random(1000 + numero)
+      while time.perf_counter() < fim:
+         try:
+            if chaves:
+               SessionStore(session_key=gerador.choice(chaves)).load()
+            Livro.objects.filter(id__lte=gerador.randint(1, 1000)).count()
+            conta("leituras")
+         except OperationalError as erro:
+            if "locked" not in str(erro):
+               raise
+            conta("travado")
+      connections.close_all()
+
+   threads:list[threading.Thread] = [threading.Thread(target=escritor, args=(i,)) for i in range(escritores)]
+   threads += [threading.Thread(target=leitor, args=(i,)) for i in range(leitores)]
+   inicio:float = time.perf_counter()
+   for thread in threads:
+      thread.start()
+   for thread in threads:
+      thread.join()
+   duracao:float = time.perf_counter() - inicio
+   return {
+      **contagens,
+      "escritas_por_segundo": contagens["escritas"] / duracao,
+      "leituras_por_segundo": contagens["leituras"] / duracao
+   }
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Compara o SQLite padrão e o perfil de produção com várias threads.")
+   parser.add_argument("--escritores", type=int, default=8)
+   parser.add_argument("--leitores", type=int, default=16)
+   parser.add_argument("--segundos", type=float, default=5)
+   parser.add_argument("--trabalho", action="store_true", help=argparse.SUPPRESS) #processo filho de um perfil
+   argumentos = parser.parse_args()
+   os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mynewdjangoapp.settings")
+
+   if argumentos.trabalho:
+      print(json.dumps(trabalho(argumentos.escritores, argumentos.leitores, argumentos.segundos)))
+      sys.exit()
+
+   print(f"{argumentos.escritores} threads escrevendo, {argumentos.leitores} lendo, {argumentos.segundos:g}s por perfil")
+   print(f"{'perfil':<10} {'escritas/s':>11} {'leituras/s':>11} {'database is locked':>19}")
+   for perfil in PERFIS:
+      diretorio:str = tempfile.mkdtemp()
+      try:
+         ambiente:dict = dict(os.environ, DJANGO_SQLITE_PERFIL=perfil, DJANGO_SQLITE_ARQUIVO=os.path.join(diretorio, "db.sqlite3"))
+         subprocess.run([sys.executable, "manage.py", "migrate", "-v0"], cwd=DIRETORIO, env=ambiente, check=True)
+         saida = subprocess.run(
+            [sys.executable, __file__, "--trabalho", "--escritores", str(argumentos.escritores),
+             "--leitores", str(argumentos.leitores), "--segundos", str(argumentos.segundos)],
+            cwd=DIRETORIO, env=ambiente, check=True, capture_output=True, text=True
+         )
+         resultado:dict = json.loads(saida.stdout.strip().splitlines()[-1])
+         print(f"{perfil:<10} {resultado['escritas_por_segundo']:>11.0f} {resultado['leituras_por_segundo']:>11.0f} {resultado['travado']:>19}")
+      finally:
+         shutil.rmtree(diretorio, ignore_errors=True)
@@ -1,5 +1,19 @@
 from django.contrib import admin
+from django.utils.html import format_html
 from . import models
 
 
-admin.site.register(models.Example)
+@admin.register(models.Example)
+class ExampleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'miniatura_da_imagem']
+    readonly_fields = ['miniatura', 'imagem_webp']
+
+    @admin.display(description='imagem')
+    def miniatura_da_imagem(self, obj):
+        imagem = obj.miniatura_exibida()
+        if not imagem:
+            return ''
+        return format_html('<img src="{}" alt="{}" width="80">', imagem.url, obj.name)
+
+
+admin.site.register(models.Livro)
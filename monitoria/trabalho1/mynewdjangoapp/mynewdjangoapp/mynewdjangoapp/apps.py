@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class AConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mynewdjangoapp'
+
+    def ready(self):
+        # registra os sinais do catálogo de livros, das miniaturas, das métricas (antes da primeira conexão ao banco) e
+        # do cache de usuários
+        from . import autenticacao, catalogo, metricas, miniaturas
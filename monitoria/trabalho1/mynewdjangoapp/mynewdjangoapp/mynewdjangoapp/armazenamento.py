@@ -0,0 +1,37 @@
+"""
+Storage dos arquivos estáticos: o ManifestStaticFilesStorage do Django (nomes com o hash do conteúdo, então as URLs
+podem ficar no cache do navegador para sempre) gerando também cópias comprimidas com gzip e brotli dos arquivos de
+texto, servidas pela view arquivo_estatico quando o navegador aceita.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError: # brotli é opcional, sem ele só as cópias .gz são geradas
+    brotli = None
+
+EXTENSOES_COMPRIMIDAS = (".css", ".js", ".svg", ".json", ".txt", ".html")
+
+
+class ManifestComprimido(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for nome in set(self.hashed_files.values()):
+            if nome.endswith(EXTENSOES_COMPRIMIDAS):
+                self._comprime(nome)
+
+    def _comprime(self, nome):
+        with self.open(nome) as f:
+            conteudo = f.read()
+        copias = {".gz": gzip.compress(conteudo, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            copias[".br"] = brotli.compress(conteudo, quality=11)
+        for extensao, comprimido in copias.items():
+            if len(comprimido) < len(conteudo): # só vale a pena se ficou menor
+                with open(self.path(nome + extensao), "wb") as f:
+                    f.write(comprimido)
@@ -3,6 +3,17 @@ ASGI config for mynewdjangoapp project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Aqui as URLs usam as versões assíncronas das views (PaginaInicialAsync e BotaoViewAsync, pelo VIEWS_ASSINCRONAS),
+que rodam direto no event loop, sem passar por uma thread a cada request. Os middlewares do Django 4.2 ainda rodam
+numa thread (sync_to_async) em cada request, então no benchmark_servidores.py o WSGI continua com mais vazão.
+
+Para rodar (no diretório do manage.py, com o banco já migrado):
+
+    uvicorn mynewdjangoapp.asgi:application --workers 4
+    daphne mynewdjangoapp.asgi:application
+
+Em produção, rode antes o "manage.py collectstatic" e desligue o DEBUG.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +23,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mynewdjangoapp.settings')
+os.environ.setdefault('DJANGO_VIEWS_ASSINCRONAS', '1')
 
 application = get_asgi_application()
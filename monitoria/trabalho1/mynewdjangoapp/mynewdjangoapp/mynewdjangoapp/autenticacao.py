@@ -0,0 +1,88 @@
+"""
+Backend de autenticação que guarda o usuário logado no cache (AUTHENTICATION_BACKENDS), para que um request de um
+usuário logado não consulte a tabela auth_user.
+
+O AuthenticationMiddleware carrega o usuário da sessão a cada request pelo get_user do backend. Aqui o usuário fica no
+cache SESSION_CACHE_ALIAS por USUARIO_CACHE_SEGUNDOS e é invalidado quando ele é salvo (troca de senha, is_active,
+is_staff, is_superuser), apagado ou quando os grupos e permissões dele mudam. A senha do usuário em cache é a usada
+pelo Django para conferir o hash da sessão, então depois de uma troca de senha as outras sessões do usuário deixam de
+valer no próximo request, como sem o cache. O cache é compartilhado entre os processos do servidor (ver sessoes.py),
+então a invalidação vale para todos eles.
+
+As permissões não vão para o cache: o usuário é guardado logo depois de lido do banco, antes de qualquer has_perm,
+e as permissões continuam sendo lidas do banco (uma vez por request) quando alguma é verificada.
+
+Invalidar grava uma marca no lugar do usuário por alguns segundos: um request que leu o usuário do banco antes da
+alteração não consegue guardar a versão antiga no cache depois dela (o cache.add não sobrescreve a marca).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+Usuario = get_user_model()
+
+INVALIDADO = "invalidado" # marca que impede guardar o usuário por SEGUNDOS_MARCA_INVALIDADO
+SEGUNDOS_MARCA_INVALIDADO = 10
+
+
+def _cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def _chave(user_id):
+    return f"mynewdjangoapp.usuario:{user_id}"
+
+
+class BackendComCache(ModelBackend):
+
+    def get_user(self, user_id):
+        usuario = _cache().get(_chave(user_id))
+        if isinstance(usuario, Usuario):
+            return usuario
+        usuario = super().get_user(user_id)
+        if usuario is not None:
+            _cache().add(_chave(user_id), usuario, settings.USUARIO_CACHE_SEGUNDOS)
+        return usuario
+
+
+def invalidar(user_id):
+    _cache().set(_chave(user_id), INVALIDADO, SEGUNDOS_MARCA_INVALIDADO)
+
+
+def _invalida_depois_do_commit(ids):
+    for user_id in ids:
+        invalidar(user_id)
+    # dentro de uma transação, outro request pode ler o usuário antigo antes do commit, então invalida de novo depois dele
+    transaction.on_commit(lambda: [invalidar(user_id) for user_id in ids])
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def _usuario_alterado(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        return # um usuário novo ainda não está no cache
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return # o login só atualiza o last_login, que não muda nada na autenticação
+    _invalida_depois_do_commit([instance.pk])
+
+
+_CAMPOS_M2M = {Usuario.groups.through: "groups", Usuario.user_permissions.through: "user_permissions"}
+
+
+@receiver(m2m_changed, sender=Usuario.groups.through)
+@receiver(m2m_changed, sender=Usuario.user_permissions.through)
+def _permissoes_alteradas(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        ids = [instance.pk]
+    elif reverse and action in ("post_add", "post_remove"):
+        ids = list(pk_set)
+    elif reverse and action == "pre_clear":
+        # grupo.user_set.clear(): os usuários afetados só podem ser lidos antes de o clear apagar as ligações
+        ids = list(Usuario._default_manager.filter(**{_CAMPOS_M2M[sender]: instance}).values_list("pk", flat=True))
+    else:
+        return
+    _invalida_depois_do_commit(ids)
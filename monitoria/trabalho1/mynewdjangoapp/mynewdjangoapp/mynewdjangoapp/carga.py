@@ -0,0 +1,142 @@
+"""
+Gerador de carga HTTP usado pelos benchmarks do site: conexões HTTP/1.1 com keep-alive, feitas com asyncio e sem
+dependências além do Python, cada uma fazendo um GET atrás do outro e guardando a latência e o status de cada resposta.
+
+Uma requisição que falha (conexão recusada ou fechada, resposta inválida, mais de TEMPO_LIMITE segundos sem resposta)
+conta em falhas_conexao e a conexão é aberta de novo, então todas as conexões continuam fazendo requisições até o fim.
+"""
+import asyncio
+import socket
+import subprocess
+import time
+from dataclasses import dataclass, field
+
+TEMPO_LIMITE = 10 #segundos esperando uma resposta antes de contar como falha
+PAUSA_DEPOIS_DE_FALHA = 0.05 #segundos antes de reconectar, para um servidor fora do ar não virar um laço sem espera
+
+
+@dataclass
+class ResultadoCarga:
+    latencias: list = field(default_factory=list) #segundos, de cada resposta recebida
+    status: dict = field(default_factory=dict) #quantidade de respostas por status
+    falhas_conexao: int = 0 #requisições sem resposta válida
+    duracao: float = 0.0
+
+    @property
+    def requisicoes(self):
+        return len(self.latencias)
+
+    @property
+    def erros(self):
+        """
+        Respostas 4xx/5xx mais as falhas de conexão.
+        """
+        return self.falhas_conexao + sum(quantidade for status, quantidade in self.status.items() if status >= 400)
+
+    def percentil(self, p):
+        """
+        Latência do percentil p (0-100), em segundos.
+        """
+        if not self.latencias:
+            return float("nan")
+        ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def espera_servidor(porta, processo: subprocess.Popen, limite=30):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError("o servidor terminou antes de começar a aceitar conexões")
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("o servidor não começou a aceitar conexões a tempo")
+
+
+async def _le_chunked(leitor):
+    while True:
+        tamanho = int((await leitor.readuntil(b"\r\n")).split(b";")[0], 16)
+        if tamanho == 0:
+            break
+        await leitor.readexactly(tamanho + 2) #o pedaço e o \r\n depois dele
+    while await leitor.readuntil(b"\r\n") != b"\r\n": #trailers, até a linha em branco
+        pass
+
+
+async def _le_resposta(leitor):
+    cabecalho = await leitor.readuntil(b"\r\n\r\n")
+    tamanho = 0
+    chunked = False
+    fecha = cabecalho.startswith(b"HTTP/1.0")
+    for linha in cabecalho.split(b"\r\n")[1:]:
+        nome, _, valor = linha.partition(b":")
+        nome = nome.strip().lower()
+        if nome == b"content-length":
+            tamanho = int(valor)
+        elif nome == b"transfer-encoding":
+            chunked = valor.strip().lower().endswith(b"chunked")
+        elif nome == b"connection":
+            fecha = valor.strip().lower() == b"close"
+    if chunked:
+        await _le_chunked(leitor)
+    elif tamanho:
+        await leitor.readexactly(tamanho)
+    elif fecha:
+        await leitor.read() #sem Content-Length, o corpo vai até o servidor fechar a conexão
+    return int(cabecalho[9:12]), fecha
+
+
+async def _requisicao(leitor, escritor, requisicao):
+    escritor.write(requisicao)
+    return await _le_resposta(leitor)
+
+
+async def _conexao(porta, caminho, fim, resultado: ResultadoCarga):
+    requisicao = f"GET {caminho} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    escritor = None
+    try:
+        while time.perf_counter() < fim:
+            try:
+                if escritor is None:
+                    leitor, escritor = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", porta), TEMPO_LIMITE)
+                inicio = time.perf_counter()
+                status, fecha = await asyncio.wait_for(_requisicao(leitor, escritor, requisicao), TEMPO_LIMITE)
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+                resultado.falhas_conexao += 1
+                if escritor is not None: #a conexão pode ter ficado no meio de uma resposta, abre outra
+                    escritor.close()
+                    escritor = None
+                await asyncio.sleep(PAUSA_DEPOIS_DE_FALHA)
+                continue
+            resultado.latencias.append(time.perf_counter() - inicio)
+            resultado.status[status] = resultado.status.get(status, 0) + 1
+            if fecha: #servidor sem keep-alive, abre outra conexão
+                escritor.close()
+                escritor = None
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+async def _carga(porta, caminho, num_conexoes, segundos):
+    resultado = ResultadoCarga()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_conexao(porta, caminho, inicio + segundos, resultado) for _ in range(num_conexoes)))
+    resultado.duracao = time.perf_counter() - inicio
+    return resultado
+
+
+def carga(porta, caminho, num_conexoes, segundos) -> ResultadoCarga:
+    """
+    Faz GET em caminho com num_conexoes conexões simultâneas durante segundos.
+    """
+    return asyncio.run(_carga(porta, caminho, num_conexoes, segundos))
@@ -0,0 +1,82 @@
+"""
+Catálogo de livros em memória, usado pela recomendação aleatória.
+
+Os livros são lidos do banco uma vez por processo e ficam numa tupla. Salvar ou apagar um Livro invalida o catálogo
+(pelos sinais post_save/post_delete) e a próxima recomendação lê o banco de novo. Como o catálogo é de cada processo,
+com vários processos do servidor cada um só vê as alterações feitas por ele mesmo, as feitas em outro processo só
+aparecem quando ele é reiniciado.
+"""
+import random
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Livro
+
+_livros = None #tupla de dicts com titulo e descricao, None enquanto não foi carregado
+_versao = 0 #aumenta a cada invalidação, um carregamento que começou antes dela não é guardado
+_trava = threading.Lock()
+
+
+def _guarda(catalogo, versao):
+    global _livros
+    with _trava:
+        if versao == _versao:
+            _livros = catalogo
+    return catalogo
+
+
+def livros():
+    """
+    Livros do catálogo, carregando do banco só na primeira chamada depois de uma invalidação.
+    """
+    catalogo = _livros
+    if catalogo is None:
+        versao = _versao
+        catalogo = _guarda(tuple(livro.como_dict() for livro in Livro.objects.order_by("id")), versao)
+    return catalogo
+
+
+async def alivros():
+    """
+    Versão assíncrona de livros(), para as views assíncronas: com o catálogo carregado ela não sai do event loop.
+    """
+    catalogo = _livros
+    if catalogo is None:
+        versao = _versao
+        catalogo = _guarda(tuple([livro.como_dict() async for livro in Livro.objects.order_by("id")]), versao)
+    return catalogo
+
+
+def _escolhe(catalogo):
+    if not catalogo:
+        return None
+    return catalogo[random.randrange(len(catalogo))]
+
+
+def livro_aleatorio():
+    """
+    Um livro aleatório do catálogo (O(1), sem ORDER BY RANDOM() no banco), ou None se não há livros cadastrados.
+    """
+    return _escolhe(livros())
+
+
+async def alivro_aleatorio():
+    return _escolhe(await alivros())
+
+
+def invalidar():
+    global _livros, _versao
+    with _trava:
+        _livros = None
+        _versao += 1
+
+
+@receiver(post_save, sender=Livro)
+@receiver(post_delete, sender=Livro)
+def _livro_alterado(sender, **kwargs):
+    invalidar()
+    # dentro de uma transação, outra thread pode recarregar o catálogo antes do commit, então invalida de novo depois dele
+    transaction.on_commit(invalidar)
@@ -0,0 +1,104 @@
+"""
+Benchmark de carga do site, para acompanhar regressões de vazão: sobe o app numa porta local, com um banco novo
+(migrado num diretório temporário, então a execução não depende do db.sqlite3 e pode ser repetida), e faz GETs com
+várias conexões simultâneas em cada caminho. O resultado (req/s, latências p50/p95/p99 e taxa de erros por caminho) sai
+em JSON, para comparar execuções com um diff. Roda sem rede: o servidor, o banco e o gerador de carga são locais.
+
+Uso:
+   python manage.py benchmark_site
+   python manage.py benchmark_site --conexoes 100 --segundos 10 --saida antes.json
+   python manage.py benchmark_site --servidor gunicorn --workers 2
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mynewdjangoapp.carga import carga, espera_servidor, porta_livre
+
+CAMINHOS = ["/", "/livroaleatorio", "/accounts/login/", "/static/style.css", "/static/logo.jpeg"]
+SERVIDORES = ["runserver", "gunicorn", "uvicorn"]
+
+
+def comando_servidor(servidor, porta, workers):
+    if servidor == "runserver":
+        return [sys.executable, "manage.py", "runserver", f"127.0.0.1:{porta}", "--noreload"]
+    if servidor == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "mynewdjangoapp.wsgi:application", "--bind", f"127.0.0.1:{porta}",
+                "--workers", str(workers), "--worker-class", "gthread", "--threads", "8", "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "mynewdjangoapp.asgi:application", "--host", "127.0.0.1", "--port", str(porta),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+
+
+class Command(BaseCommand):
+    help = "Mede req/s, latências p50/p95/p99 e taxa de erros do site numa porta local e mostra o resultado em JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--caminhos", nargs="+", default=CAMINHOS)
+        parser.add_argument("--conexoes", type=int, default=50, help="conexões simultâneas em cada caminho")
+        parser.add_argument("--segundos", type=float, default=5, help="duração da medição de cada caminho")
+        parser.add_argument("--aquecimento", type=float, default=1, help="segundos de carga antes de medir cada caminho")
+        parser.add_argument("--servidor", choices=SERVIDORES, default="runserver", help="runserver só precisa do Django")
+        parser.add_argument("--workers", type=int, default=1, help="processos do gunicorn/uvicorn")
+        parser.add_argument("--saida", help="arquivo JSON do resultado (padrão: só mostra na tela)")
+
+    def handle(self, *args, **options):
+        diretorio = tempfile.mkdtemp()
+        ambiente = dict(os.environ, DJANGO_SQLITE_ARQUIVO=os.path.join(diretorio, "db.sqlite3"))
+        processo = None
+        try:
+            subprocess.run([sys.executable, "manage.py", "migrate", "-v0"], cwd=settings.BASE_DIR, env=ambiente, check=True)
+            porta = porta_livre()
+            processo = subprocess.Popen(
+                comando_servidor(options["servidor"], porta, options["workers"]), cwd=settings.BASE_DIR, env=ambiente,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, #o log de cada request do runserver não entra na medição
+            )
+            try:
+                espera_servidor(porta, processo)
+            except RuntimeError as erro:
+                raise CommandError(f"{erro} (o {options['servidor']} está instalado?)")
+
+            resultados = {}
+            for caminho in options["caminhos"]:
+                if options["aquecimento"] > 0:
+                    carga(porta, caminho, options["conexoes"], options["aquecimento"]) #templates, catálogo e cache da página
+                resultado = carga(porta, caminho, options["conexoes"], options["segundos"])
+                total = resultado.requisicoes + resultado.falhas_conexao
+                resultados[caminho] = {
+                    "requisicoes": resultado.requisicoes,
+                    "rps": round(resultado.requisicoes / resultado.duracao, 1),
+                    "p50_ms": round(resultado.percentil(50) * 1000, 2),
+                    "p95_ms": round(resultado.percentil(95) * 1000, 2),
+                    "p99_ms": round(resultado.percentil(99) * 1000, 2),
+                    "erros": resultado.erros,
+                    "taxa_erros": round(resultado.erros / total, 4) if total else 0.0,
+                    "status": {str(status): quantidade for status, quantidade in sorted(resultado.status.items())},
+                }
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait()
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+        relatorio = {
+            "servidor": options["servidor"],
+            "workers": options["workers"] if options["servidor"] != "runserver" else 1,
+            "conexoes": options["conexoes"],
+            "segundos": options["segundos"],
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "cpus": os.cpu_count(),
+            "caminhos": resultados,
+        }
+        texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options["saida"]:
+            with open(options["saida"], "w", encoding="utf-8") as f:
+                f.write(texto + "\n")
+        self.stdout.write(texto)
@@ -0,0 +1,71 @@
+"""
+Passo de build das imagens estáticas: gera versões menores (JPEG recomprimido e WebP) de cada imagem de static/ em
+várias larguras, para o template servir com srcset/<picture> só os bytes que a tela precisa.
+
+Uso (antes do collectstatic):
+   python manage.py gera_imagens
+   python manage.py collectstatic
+"""
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+LARGURAS = [160, 320, 480, 800, 1200, 1600]
+EXTENSOES_IMAGEM = (".jpeg", ".jpg", ".png")
+
+
+class Command(BaseCommand):
+    help = "Gera as variantes redimensionadas (JPEG e WebP) das imagens de static/ e o variantes.json."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--larguras", type=int, nargs="+", default=LARGURAS, help="larguras das variantes, em pixels")
+        parser.add_argument("--qualidade-jpeg", type=int, default=80)
+        parser.add_argument("--qualidade-webp", type=int, default=75)
+        parser.add_argument("--refazer", action="store_true", help="gera de novo variantes que já estão atualizadas")
+
+    def handle(self, *args, **options):
+        origem = settings.STATICFILES_DIRS[0]
+        destino = settings.IMAGENS_VARIANTES_DIR
+        os.makedirs(destino, exist_ok=True)
+        prefixo = os.path.relpath(destino, origem).replace(os.sep, "/")
+
+        variantes = {}
+        bytes_originais = bytes_jpeg = bytes_webp = 0
+        for nome in sorted(os.listdir(origem)):
+            caminho = os.path.join(origem, nome)
+            if not nome.lower().endswith(EXTENSOES_IMAGEM) or not os.path.isfile(caminho):
+                continue
+            with Image.open(caminho) as imagem:
+                imagem = imagem.convert("RGB")
+                base = os.path.splitext(nome)[0]
+                larguras = sorted({largura for largura in options["larguras"] if largura < imagem.width} | {imagem.width})
+                lista = []
+                for largura in larguras:
+                    arquivos = {"jpeg": f"{base}-{largura}.jpeg", "webp": f"{base}-{largura}.webp"}
+                    if options["refazer"] or any(
+                        not os.path.exists(os.path.join(destino, arquivo))
+                        or os.path.getmtime(os.path.join(destino, arquivo)) < os.path.getmtime(caminho)
+                        for arquivo in arquivos.values()
+                    ):
+                        redimensionada = imagem if largura == imagem.width else imagem.resize(
+                            (largura, round(imagem.height * largura / imagem.width)), Image.LANCZOS
+                        )
+                        redimensionada.save(os.path.join(destino, arquivos["jpeg"]), "JPEG", quality=options["qualidade_jpeg"], optimize=True, progressive=True)
+                        redimensionada.save(os.path.join(destino, arquivos["webp"]), "WEBP", quality=options["qualidade_webp"], method=6)
+                    lista.append({"largura": largura, **{formato: f"{prefixo}/{arquivo}" for formato, arquivo in arquivos.items()}})
+                variantes[nome] = {"largura": imagem.width, "altura": imagem.height, "variantes": lista}
+
+            bytes_originais += os.path.getsize(caminho)
+            bytes_jpeg += os.path.getsize(os.path.join(origem, lista[-1]["jpeg"]))
+            bytes_webp += os.path.getsize(os.path.join(origem, lista[-1]["webp"]))
+
+        with open(os.path.join(destino, "variantes.json"), "w", encoding="utf-8") as f:
+            json.dump(variantes, f, indent=2)
+
+        self.stdout.write(f"{len(variantes)} imagens, variantes em {destino}")
+        self.stdout.write(f"   originais:                 {bytes_originais / 1024:8.0f} KB")
+        self.stdout.write(f"   JPEG na largura original:  {bytes_jpeg / 1024:8.0f} KB")
+        self.stdout.write(f"   WebP na largura original:  {bytes_webp / 1024:8.0f} KB")
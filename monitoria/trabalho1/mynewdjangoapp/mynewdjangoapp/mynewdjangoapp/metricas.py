@@ -0,0 +1,251 @@
+"""
+Métricas de desempenho por rota, expostas em /metrics no formato texto do Prometheus.
+
+O MetricasMiddleware mede toda requisição (latência, status e tamanho da resposta), o que custa só duas leituras do
+relógio e a atualização de um histograma. Uma amostra das requisições (METRICAS_AMOSTRAGEM) é medida em detalhe: número
+e tempo das consultas SQL e tempo de renderização dos templates. Requisições amostradas mais lentas que
+METRICAS_LENTO_SEGUNDOS são registradas no log com as consultas mais demoradas. Com METRICAS_ATIVAS = False o
+middleware é retirado da pilha e o wrapper das consultas não é instalado nas conexões, então as consultas não custam
+nada a mais.
+
+As consultas são contadas por um execute_wrapper instalado em cada conexão nova, e os templates pelo backend
+TemplatesComMetricas. Os dois só medem quando há uma coleta no ContextVar da requisição, que também vale dentro do
+sync_to_async, então as views assíncronas são medidas do mesmo jeito. As métricas são de cada processo do servidor.
+"""
+import bisect
+import heapq
+import logging
+import random
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) #limites (le) do histograma, em segundos
+CONSULTAS_NO_LOG = 5 #consultas mais demoradas registradas no log de requisições lentas
+
+logger = logging.getLogger(__name__)
+
+_coleta = ContextVar("coleta_metricas", default=None)
+_trava = threading.Lock()
+_series = {}
+
+
+class _Coleta:
+    """
+    Medidas detalhadas de uma requisição amostrada.
+    """
+    __slots__ = ("consultas", "segundos_sql", "segundos_template", "mais_lentas")
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos_sql = 0.0
+        self.segundos_template = 0.0
+        self.mais_lentas = [] #heap com as (segundos, sql) mais demoradas
+
+    def registra_consulta(self, segundos, sql):
+        self.consultas += 1
+        self.segundos_sql += segundos
+        if len(self.mais_lentas) < CONSULTAS_NO_LOG:
+            heapq.heappush(self.mais_lentas, (segundos, sql))
+        elif segundos > self.mais_lentas[0][0]:
+            heapq.heapreplace(self.mais_lentas, (segundos, sql))
+
+
+class _Serie:
+    """
+    Métricas acumuladas de uma rota e método.
+    """
+    __slots__ = ("buckets", "soma", "quantidade", "bytes", "status", "amostradas", "consultas", "segundos_sql", "segundos_template")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LIMITES_LATENCIA) + 1) #o último é o +Inf
+        self.soma = 0.0
+        self.quantidade = 0
+        self.bytes = 0
+        self.status = {}
+        self.amostradas = 0
+        self.consultas = 0
+        self.segundos_sql = 0.0
+        self.segundos_template = 0.0
+
+
+def _sql_medido(execute, sql, params, many, context):
+    coleta = _coleta.get()
+    if coleta is None:
+        return execute(sql, params, many, context)
+    inicio = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        coleta.registra_consulta(perf_counter() - inicio, sql)
+
+
+@receiver(connection_created)
+def _instala_wrapper_sql(sender, connection, **kwargs):
+    if not settings.METRICAS_ATIVAS:
+        return
+    if _sql_medido not in connection.execute_wrappers: #o mesmo DatabaseWrapper reconecta depois do CONN_MAX_AGE
+        connection.execute_wrappers.append(_sql_medido)
+
+
+class _TemplateMedido(Template):
+    def render(self, context=None, request=None):
+        coleta = _coleta.get()
+        if coleta is None:
+            return super().render(context, request)
+        inicio = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            coleta.segundos_template += perf_counter() - inicio
+
+
+class TemplatesComMetricas(DjangoTemplates):
+    """
+    Backend de templates do Django que mede o tempo de renderização nas requisições amostradas.
+    """
+    def from_string(self, template_code):
+        return _TemplateMedido(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return _TemplateMedido(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def _registra(request, response, segundos, coleta):
+    rota = request.resolver_match.route if request.resolver_match else "<sem rota>"
+    if not rota.startswith("/"):
+        rota = "/" + rota
+    tamanho = len(response.content) if not response.streaming else int(response.get("Content-Length", 0))
+    with _trava:
+        serie = _series.get((rota, request.method))
+        if serie is None:
+            serie = _series[(rota, request.method)] = _Serie()
+        serie.buckets[bisect.bisect_left(LIMITES_LATENCIA, segundos)] += 1
+        serie.soma += segundos
+        serie.quantidade += 1
+        serie.bytes += tamanho
+        serie.status[response.status_code] = serie.status.get(response.status_code, 0) + 1
+        if coleta is not None:
+            serie.amostradas += 1
+            serie.consultas += coleta.consultas
+            serie.segundos_sql += coleta.segundos_sql
+            serie.segundos_template += coleta.segundos_template
+    if coleta is not None and segundos >= settings.METRICAS_LENTO_SEGUNDOS:
+        consultas = "".join(f"\n   {tempo * 1000:.1f} ms  {sql}" for tempo, sql in sorted(coleta.mais_lentas, reverse=True))
+        logger.warning(
+            "Requisição lenta: %s %s (%s) em %.0f ms, %d consultas SQL (%.0f ms), templates %.0f ms%s",
+            request.method, request.path, rota, segundos * 1000, coleta.consultas, coleta.segundos_sql * 1000,
+            coleta.segundos_template * 1000, consultas,
+        )
+
+
+class MetricasMiddleware:
+    """
+    Mede as requisições (veja a documentação do módulo). Deve ser o primeiro do MIDDLEWARE, para medir os outros também.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICAS_ATIVAS:
+            raise MiddlewareNotUsed
+        for conexao in connections.all(initialized_only=True): #conexões abertas antes do app carregar este módulo
+            _instala_wrapper_sql(None, conexao)
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        coleta = _Coleta() if random.random() < settings.METRICAS_AMOSTRAGEM else None
+        token = _coleta.set(coleta)
+        inicio = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        _registra(request, response, perf_counter() - inicio, coleta)
+        return response
+
+    async def __acall__(self, request):
+        coleta = _Coleta() if random.random() < settings.METRICAS_AMOSTRAGEM else None
+        token = _coleta.set(coleta)
+        inicio = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        _registra(request, response, perf_counter() - inicio, coleta)
+        return response
+
+
+def _rotulos(**rotulos):
+    texto = ",".join(
+        '%s="%s"' % (nome, str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for nome, valor in rotulos.items()
+    )
+    return "{" + texto + "}"
+
+
+def texto_prometheus():
+    """
+    Todas as métricas acumuladas, no formato texto do Prometheus (versão 0.0.4).
+    """
+    with _trava:
+        series = {chave: (list(serie.buckets), dict(serie.status), serie.soma, serie.quantidade, serie.bytes,
+                          serie.amostradas, serie.consultas, serie.segundos_sql, serie.segundos_template)
+                  for chave, serie in _series.items()}
+
+    linhas = [
+        "# HELP django_requisicao_segundos Latência das requisições, por rota e método.",
+        "# TYPE django_requisicao_segundos histogram",
+    ]
+    for (rota, metodo), (buckets, _, soma, quantidade, *_) in sorted(series.items()):
+        acumulado = 0
+        for limite, quantidade_bucket in zip(LIMITES_LATENCIA + ("+Inf",), buckets):
+            acumulado += quantidade_bucket
+            linhas.append(f"django_requisicao_segundos_bucket{_rotulos(rota=rota, metodo=metodo, le=limite)} {acumulado}")
+        linhas.append(f"django_requisicao_segundos_sum{_rotulos(rota=rota, metodo=metodo)} {soma}")
+        linhas.append(f"django_requisicao_segundos_count{_rotulos(rota=rota, metodo=metodo)} {quantidade}")
+
+    linhas += ["# HELP django_respostas_total Respostas, por rota, método e status.", "# TYPE django_respostas_total counter"]
+    for (rota, metodo), (_, status, *_) in sorted(series.items()):
+        for codigo, quantidade in sorted(status.items()):
+            linhas.append(f"django_respostas_total{_rotulos(rota=rota, metodo=metodo, status=codigo)} {quantidade}")
+
+    contadores = [
+        ("django_resposta_bytes_total", "Bytes do corpo das respostas.", 4),
+        ("django_requisicoes_amostradas_total", "Requisições medidas em detalhe (SQL e templates).", 5),
+        ("django_sql_consultas_total", "Consultas SQL das requisições amostradas.", 6),
+        ("django_sql_segundos_total", "Tempo das consultas SQL das requisições amostradas.", 7),
+        ("django_template_segundos_total", "Tempo de renderização dos templates das requisições amostradas.", 8),
+    ]
+    for nome, descricao, indice in contadores:
+        linhas += [f"# HELP {nome} {descricao}", f"# TYPE {nome} counter"]
+        for (rota, metodo), valores in sorted(series.items()):
+            linhas.append(f"{nome}{_rotulos(rota=rota, metodo=metodo)} {valores[indice]}")
+    return "\n".join(linhas) + "\n"
+
+
+def exporta_metricas(request):
+    """
+    View do /metrics. Só responde para os IPs de METRICAS_IPS (None libera para todos).
+    """
+    if settings.METRICAS_IPS is not None and request.META.get("REMOTE_ADDR") not in settings.METRICAS_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(texto_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
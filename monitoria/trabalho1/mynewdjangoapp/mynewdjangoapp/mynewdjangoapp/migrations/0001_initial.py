@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Example',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+                ('image', models.ImageField(null=True, upload_to='static/example/')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Livro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titulo', models.CharField(max_length=100)),
+                ('descricao', models.TextField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+LIVROS = [
+    {"titulo": "Telefone Preto", "descricao": "A luta de um garoto sequestrado contra um serial killer em um suspense de tirar o fôlego."},
+    {"titulo": "O Castelo Animado", "descricao": "A mágica jornada de Sophie para quebrar uma maldição e descobrir o amor no castelo do mago Howl."},
+    {"titulo": "Blue Period", "descricao": "Yatora descobre sua paixão pela arte e embarca em um intenso desafio rumo à faculdade de artes."},
+    {"titulo": "A Mecânica do Amor", "descricao": "Uma mulher independente encontra um novo significado para o amor com um misterioso mecânico."},
+    {"titulo": "Imperfeitos", "descricao": "Celestine desafia um sistema que exige perfeição, tornando-se símbolo de resistência."},
+    {"titulo": "Melhor do que nos Filmes", "descricao": "Liz descobre que o amor verdadeiro pode ser inesperado, superando até mesmo os clichês dos livros."},
+]
+
+
+def cria_livros(apps, schema_editor):
+    Livro = apps.get_model('mynewdjangoapp', 'Livro')
+    Livro.objects.bulk_create(Livro(**livro) for livro in LIVROS)
+
+
+def apaga_livros(apps, schema_editor):
+    Livro = apps.get_model('mynewdjangoapp', 'Livro')
+    Livro.objects.filter(titulo__in=[livro["titulo"] for livro in LIVROS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mynewdjangoapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(cria_livros, apaga_livros),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mynewdjangoapp', '0002_livros_iniciais'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='example',
+            name='imagem_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='static/example/webp/'),
+        ),
+        migrations.AddField(
+            model_name='example',
+            name='miniatura',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='static/example/miniaturas/'),
+        ),
+    ]
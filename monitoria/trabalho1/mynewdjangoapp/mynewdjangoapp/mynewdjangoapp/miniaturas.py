@@ -0,0 +1,104 @@
+"""
+Geração das variantes de Example.image (miniatura e versão WebP) em segundo plano.
+
+Quando um Example é salvo com uma imagem nova, a geração vai para uma fila de threads do próprio processo depois do
+commit, e o request (o save do admin, por exemplo) volta sem esperar. As variantes são gravadas no modelo quando ficam
+prontas; até lá o modelo usa a imagem original. Com MINIATURAS_SINCRONAS = True as variantes são geradas na hora,
+dentro do save (usado para testar sem a thread). Os arquivos das variantes de uma imagem trocada são apagados.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+from .models import Example
+
+logger = logging.getLogger(__name__)
+
+LARGURA_MINIATURA = 320
+LARGURA_MAXIMA_WEBP = 1600
+QUALIDADE_WEBP = 80
+
+_fila = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miniaturas")
+
+
+def _webp(imagem, largura_maxima):
+    copia = imagem.copy()
+    copia.thumbnail((largura_maxima, largura_maxima * 4)) # limita só a largura, mantendo a proporção
+    saida = io.BytesIO()
+    copia.save(saida, "WEBP", quality=QUALIDADE_WEBP, method=6)
+    return ContentFile(saida.getvalue())
+
+
+def _apaga_arquivos(storage, nomes):
+    for nome in nomes:
+        if nome:
+            storage.delete(nome)
+
+
+def gera_variantes(pk):
+    """
+    Gera a miniatura e a versão WebP da imagem de um Example e grava no modelo, apagando os arquivos das variantes
+    anteriores. Se a imagem foi trocada enquanto as variantes eram geradas, elas não são gravadas (e os arquivos novos
+    são apagados, a imagem nova tem a sua própria geração na fila).
+    """
+    try:
+        exemplo = Example.objects.get(pk=pk)
+        if not exemplo.image:
+            return
+        nome_imagem = exemplo.image.name
+        anteriores = [exemplo.miniatura.name, exemplo.imagem_webp.name]
+        with exemplo.image.open("rb") as f, Image.open(f) as original:
+            imagem = ImageOps.exif_transpose(original).convert("RGB")
+        base = os.path.splitext(os.path.basename(nome_imagem))[0]
+        exemplo.miniatura.save(f"{base}.webp", _webp(imagem, LARGURA_MINIATURA), save=False)
+        exemplo.imagem_webp.save(f"{base}.webp", _webp(imagem, LARGURA_MAXIMA_WEBP), save=False)
+        novas = [exemplo.miniatura.name, exemplo.imagem_webp.name]
+        # update e não save: não dispara os sinais de novo e não sobrescreve outros campos alterados nesse meio tempo
+        gravadas = Example.objects.filter(pk=pk, image=nome_imagem).update(miniatura=novas[0], imagem_webp=novas[1])
+        _apaga_arquivos(exemplo.image.storage, anteriores if gravadas else novas)
+    finally:
+        if not settings.MINIATURAS_SINCRONAS:
+            close_old_connections() # a thread da fila não passa pelo ciclo de request que fecha as conexões
+
+
+def _gera_variantes_na_fila(pk):
+    # o Future da fila é descartado, então um erro aqui (imagem inválida, disco cheio) só aparece no log
+    try:
+        gera_variantes(pk)
+    except Exception:
+        logger.exception("erro gerando as variantes da imagem do Example %s", pk)
+
+
+@receiver(pre_save, sender=Example)
+def _imagem_trocada(sender, instance, **kwargs):
+    anterior = None
+    if instance.pk:
+        anterior = Example.objects.filter(pk=instance.pk).values_list("image", "miniatura", "imagem_webp").first()
+    imagem_anterior = anterior[0] if anterior else None
+    instance._gerar_variantes = bool(instance.image) and instance.image.name != imagem_anterior
+    if anterior and (instance._gerar_variantes or not instance.image) and (anterior[1] or anterior[2]):
+        # as variantes antigas são de outra imagem: até as novas ficarem prontas o modelo usa a original, e os arquivos
+        # antigos são apagados depois do commit (um rollback ainda aponta para eles)
+        instance.miniatura = None
+        instance.imagem_webp = None
+        storage = instance.image.storage
+        transaction.on_commit(lambda: _apaga_arquivos(storage, anterior[1:]))
+
+
+@receiver(post_save, sender=Example)
+def _agenda_variantes(sender, instance, **kwargs):
+    if not getattr(instance, "_gerar_variantes", False):
+        return
+    if settings.MINIATURAS_SINCRONAS:
+        gera_variantes(instance.pk)
+    else:
+        pk = instance.pk
+        transaction.on_commit(lambda: _fila.submit(_gera_variantes_na_fila, pk))
@@ -4,4 +4,25 @@ from django.contrib.auth.models import User
 class Example(models.Model):
     name = models.CharField(max_length=30)
     image = models.ImageField(upload_to='static/example/', null=True)
+    # variantes da imagem, geradas em segundo plano (miniaturas.py) depois que a imagem é enviada
+    miniatura = models.ImageField(upload_to='static/example/miniaturas/', null=True, blank=True, editable=False)
+    imagem_webp = models.ImageField(upload_to='static/example/webp/', null=True, blank=True, editable=False)
 
+    def imagem_exibida(self):
+        """
+        Imagem usada no lugar da original: a versão WebP, ou a original enquanto ela ainda não foi gerada.
+        """
+        return self.imagem_webp or self.image
+
+    def miniatura_exibida(self):
+        return self.miniatura or self.image
+
+class Livro(models.Model):
+    titulo = models.CharField(max_length=100)
+    descricao = models.TextField()
+
+    def __str__(self):
+        return self.titulo
+
+    def como_dict(self):
+        return {"titulo": self.titulo, "descricao": self.descricao}
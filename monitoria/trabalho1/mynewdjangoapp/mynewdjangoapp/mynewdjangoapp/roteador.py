@@ -0,0 +1,24 @@
+"""
+Roteador do perfil de produção do SQLite: as leituras vão para a conexão "leitura" (somente leitura) e as escritas
+para a "default". No modo WAL as leituras não esperam as escritas, então uma leitura nunca fica presa atrás de um login
+ou de um save do admin.
+"""
+from django.db import connections
+
+
+class RoteadorLeitura:
+
+    def db_for_read(self, model, **hints):
+        # dentro de uma transação de escrita a leitura usa a mesma conexão, para ver o que ainda não teve commit
+        if connections["default"].in_atomic_block:
+            return "default"
+        return "leitura"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # as duas conexões são o mesmo arquivo
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,175 @@
+"""
+Sessões no cache com gravação no banco em segundo plano (SESSION_ENGINE = "mynewdjangoapp.sessoes").
+
+As sessões são lidas do cache SESSION_CACHE_ALIAS, então um request de um usuário logado não consulta a tabela de
+sessões. Diferente do cached_db do Django, que grava no banco a cada alteração da sessão, aqui as alterações que não
+mexem no login vão para o cache na hora e ficam numa fila do processo; uma thread grava a fila no banco a cada
+SESSAO_GRAVACAO_SEGUNDOS, todas as sessões alteradas numa transação só. O banco continua sendo a cópia durável: quando a
+sessão sai do cache (reinício do processo, cache cheio) ela é lida de lá de novo.
+
+Continuam indo direto para o banco:
+- a criação de uma sessão (e a troca de chave do login), que precisa do INSERT para garantir que a chave nova não existe;
+- toda alteração do login (_auth_user_id, _auth_user_backend, _auth_user_hash), então um login já está no banco quando
+  a resposta dele sai, e não se perde se o processo morrer;
+- o logout (delete). A fila só atualiza linhas que ainda existem, então uma gravação atrasada nunca traz de volta uma
+  sessão apagada, nem por outro processo.
+
+Se o processo morrer sem passar pelo atexit, só se perdem as alterações dos últimos SESSAO_GRAVACAO_SEGUNDOS que não
+mexem no login (mensagens, por exemplo).
+
+O cache das sessões tem que ser compartilhado entre os processos do servidor: com um cache em memória, o logout feito
+num processo não tira a sessão do cache dos outros. Com um cache que é de cada processo (LocMemCache) o backend se
+recusa a rodar, a não ser com SESSOES_PROCESSO_UNICO = True (runserver, testes).
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, router, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHAVES_LOGIN = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY) # alterações nelas vão direto para o banco
+
+_pendentes = {} # chave da sessão -> (dados codificados, data de expiração), ainda não gravados no banco
+_trava = threading.Lock()
+_trava_gravacao = threading.Lock() # uma gravação da fila e um delete nunca rodam ao mesmo tempo
+_gravador = None
+
+
+def _inicia_gravador():
+    global _gravador
+    with _trava:
+        if _gravador is None:
+            _gravador = threading.Thread(target=_grava_periodicamente, name="sessoes", daemon=True)
+            _gravador.start()
+            atexit.register(_grava_na_saida)
+
+
+def _grava_periodicamente():
+    while True:
+        time.sleep(settings.SESSAO_GRAVACAO_SEGUNDOS)
+        try:
+            grava_pendentes()
+        except Exception:
+            logger.exception("erro gravando as sessões pendentes, elas ficam para a próxima gravação")
+        finally:
+            close_old_connections() # a thread não passa pelo ciclo de request que fecha as conexões
+
+
+def _grava_na_saida():
+    try:
+        grava_pendentes()
+    except Exception:
+        logger.exception("erro gravando as sessões pendentes na saída do processo")
+
+
+def grava_pendentes():
+    """
+    Grava no banco as sessões alteradas desde a última gravação. Roda na thread de gravação e no atexit, e pode ser
+    chamada direto (nos testes, por exemplo) para não esperar o intervalo. Só atualiza as sessões que ainda estão no
+    banco: uma sessão apagada (logout) no meio tempo continua apagada.
+
+    Return:
+        (int): quantidade de sessões gravadas
+    """
+    modelo = SessionStore.get_model_class()
+    with _trava_gravacao:
+        with _trava:
+            lote = dict(_pendentes)
+            _pendentes.clear()
+        if not lote:
+            return 0
+        banco = router.db_for_write(modelo)
+        try:
+            with transaction.atomic(using=banco):
+                for chave, (dados, expiracao) in lote.items():
+                    modelo.objects.using(banco).filter(session_key=chave).update(
+                        session_data=dados, expire_date=expiracao
+                    )
+        except Exception:
+            with _trava:
+                for chave, valor in lote.items():
+                    _pendentes.setdefault(chave, valor) # uma alteração mais nova que entrou na fila vale mais
+            raise
+    return len(lote)
+
+
+class SessionStore(CachedDBStore):
+    """
+    Sessão lida do cache, depois da fila de gravação e por último do banco.
+    """
+    cache_key_prefix = "mynewdjangoapp.sessoes"
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        if isinstance(self._cache, (LocMemCache, DummyCache)) and not settings.SESSOES_PROCESSO_UNICO:
+            raise ImproperlyConfigured(
+                f"o cache {settings.SESSION_CACHE_ALIAS!r} das sessões não é compartilhado entre processos; use um "
+                "cache compartilhado ou SESSOES_PROCESSO_UNICO = True com um processo só"
+            )
+        self._login_carregado = self._login({}) # chaves do login como estavam quando a sessão foi lida
+
+    def _login(self, data):
+        return {chave: data.get(chave) for chave in CHAVES_LOGIN}
+
+    def _pendente(self, session_key):
+        with _trava:
+            return _pendentes.get(session_key)
+
+    def load(self):
+        data = self._carrega()
+        self._login_carregado = self._login(data)
+        return data
+
+    def _carrega(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            data = None
+        if data is not None:
+            return data
+        pendente = self._pendente(self.session_key)
+        if pendente is not None and pendente[1] > timezone.now(): # saiu do cache antes de ser gravada
+            data = self.decode(pendente[0])
+            self._cache.set(self.cache_key, data, self.get_expiry_age(expiry=pendente[1]))
+            return data
+        return super().load()
+
+    def exists(self, session_key):
+        return bool(session_key) and self._pendente(session_key) is not None or super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if must_create or self._login(data) != self._login_carregado:
+            # a criação vai direto para o banco (o INSERT é o que garante que a chave não existe), e o login também
+            with _trava_gravacao:
+                with _trava:
+                    _pendentes.pop(self.session_key, None) # uma versão antiga na fila não pode sobrescrever esta
+                super().save(must_create=must_create)
+            self._login_carregado = self._login(data)
+            return
+        self._cache.set(self.cache_key, data, self.get_expiry_age())
+        with _trava:
+            _pendentes[self.session_key] = (self.encode(data), self.get_expiry_date())
+        _inicia_gravador()
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        with _trava_gravacao:
+            with _trava:
+                _pendentes.pop(session_key, None)
+            super().delete(session_key)
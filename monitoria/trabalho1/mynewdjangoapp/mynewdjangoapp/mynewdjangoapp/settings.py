@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'mynewdjangoapp.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,10 +56,16 @@ ROOT_URLCONF = 'mynewdjangoapp.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'mynewdjangoapp.metricas.TemplatesComMetricas',
         'DIRS': [ BASE_DIR / 'templates' ],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # os templates são lidos e compilados uma vez por processo
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -70,17 +78,122 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'mynewdjangoapp.wsgi.application'
 
+# Usa as versões assíncronas das views. O asgi.py liga sozinho; num servidor WSGI cada view assíncrona precisaria de
+# um event loop por request, então lá as views síncronas são mais rápidas.
+VIEWS_ASSINCRONAS = os.environ.get('DJANGO_VIEWS_ASSINCRONAS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_SQLITE_PERFIL=simples usa o SQLite com a configuração padrão do Django. O perfil de produção (padrão) abre as
+# conexões em modo WAL, reaproveita as conexões entre requests e separa as leituras numa conexão somente leitura
+# (mynewdjangoapp/roteador.py), para logins e saves do admin não travarem as leituras.
+SQLITE_PERFIL = os.environ.get('DJANGO_SQLITE_PERFIL', 'producao')
+SQLITE_ARQUIVO = os.environ.get('DJANGO_SQLITE_ARQUIVO', BASE_DIR / 'db.sqlite3')
+
+if SQLITE_PERFIL == 'simples':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': SQLITE_ARQUIVO,
+        }
+    }
+else:
+    SQLITE_PRAGMAS = {
+        'busy_timeout': 20000, # ms esperando a vez de escrever antes do "database is locked"
+        'synchronous': 'NORMAL', # no WAL, só perde as últimas transações se o sistema (não o processo) cair
+        'cache_size': -20000, # 20 MB de cache de páginas por conexão
+        'temp_store': 'MEMORY',
+        'mmap_size': 128 * 1024 * 1024,
+    }
+    DATABASES = {
+        'default': {
+            'ENGINE': 'mynewdjangoapp.sqlite_wal',
+            'NAME': SQLITE_ARQUIVO,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': 20,
+                'transacao_imediata': True,
+                'pragmas': {'journal_mode': 'WAL', **SQLITE_PRAGMAS},
+            },
+        },
+        'leitura': {
+            'ENGINE': 'mynewdjangoapp.sqlite_wal',
+            'NAME': SQLITE_ARQUIVO,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': 20,
+                'pragmas': {'query_only': 'ON', **SQLITE_PRAGMAS},
+            },
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+    DATABASE_ROUTERS = ['mynewdjangoapp.roteador.RoteadorLeitura']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# CACHE_BACKEND=file guarda o cache em disco (em CACHE_DIR), compartilhado entre os processos do servidor;
+# o padrão é um cache em memória em cada processo.
+
+# O cache "sessoes" guarda as sessões e os usuários logados, separado para a página e o resto do cache não tirarem
+# sessões dele. Ele fica sempre em disco (em CACHE_DIR/sessoes), compartilhado entre os processos do servidor: um
+# logout ou uma troca de senha feitos num processo valem para todos.
+
+CACHE_DIR = Path(os.environ.get('CACHE_DIR', BASE_DIR / 'cache'))
+
+if os.environ.get('CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mynewdjangoapp',
+        },
     }
+CACHES['sessoes'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': CACHE_DIR / 'sessoes',
+    'OPTIONS': {'MAX_ENTRIES': 100000},
 }
 
+# Tempo que a página inicial renderizada fica no cache (0 desliga o cache da página)
+PAGINA_INICIAL_CACHE_SEGUNDOS = int(os.environ.get('PAGINA_INICIAL_CACHE_SEGUNDOS', 600))
+
+
+# Sessões e usuário logado no cache (mynewdjangoapp/sessoes.py e mynewdjangoapp/autenticacao.py): um request de um
+# usuário logado não consulta o banco. DJANGO_SESSOES=banco volta para as sessões e o backend padrão do Django.
+if os.environ.get('DJANGO_SESSOES') == 'banco':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+else:
+    SESSION_ENGINE = 'mynewdjangoapp.sessoes'
+    AUTHENTICATION_BACKENDS = ['mynewdjangoapp.autenticacao.BackendComCache']
+SESSION_CACHE_ALIAS = 'sessoes'
+# Permite um cache "sessoes" que é de cada processo (LocMemCache), só para um servidor com um processo (os testes)
+SESSOES_PROCESSO_UNICO = False
+SESSAO_GRAVACAO_SEGUNDOS = 2 # intervalo entre as gravações das sessões alteradas no banco
+USUARIO_CACHE_SEGUNDOS = 300
+
+
+# Métricas por rota (mynewdjangoapp/metricas.py), expostas em /metrics
+METRICAS_ATIVAS = os.environ.get('DJANGO_METRICAS_ATIVAS', '1') == '1'
+METRICAS_AMOSTRAGEM = float(os.environ.get('DJANGO_METRICAS_AMOSTRAGEM', 0.1)) # fração das requisições com SQL e templates medidos
+METRICAS_LENTO_SEGUNDOS = 0.5 # requisições amostradas mais lentas que isso vão para o log com as consultas mais demoradas
+METRICAS_IPS = ['127.0.0.1', '::1'] # quem pode ler o /metrics (None libera para todos)
+
+
+# Gera as variantes de Example.image dentro do save em vez de numa thread em segundo plano
+MINIATURAS_SINCRONAS = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -130,3 +243,22 @@ STATICFILES_DIRS = [
     BASE_DIR / "static"
 ]
 
+# Destino do collectstatic. Os arquivos coletados têm o hash do conteúdo no nome e cópias .gz/.br dos arquivos de texto
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "mynewdjangoapp.armazenamento.ManifestComprimido",
+    },
+}
+
+# Arquivos enviados (Example.image e as variantes geradas a partir dela)
+MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_URL = "media/"
+
+# Variantes das imagens geradas pelo "manage.py gera_imagens"
+IMAGENS_VARIANTES_DIR = BASE_DIR / "static" / "variantes"
+
@@ -0,0 +1,33 @@
+"""
+Backend SQLite do perfil de produção: o backend sqlite3 do Django com duas opções a mais no OPTIONS do banco, tiradas
+antes do sqlite3.connect:
+
+- "pragmas" (dict): PRAGMAs executados em cada conexão nova (modo WAL, synchronous, cache...);
+- "transacao_imediata" (bool): as transações (atomic) começam com BEGIN IMMEDIATE. Com o BEGIN normal, uma transação
+  que lê e depois escreve falha na hora com "database is locked" se outra conexão escreveu no meio, sem esperar o
+  busy_timeout; com o IMMEDIATE ela espera a vez de escrever já no começo.
+"""
+from django.db.backends.sqlite3 import base
+
+OPCOES_DO_BACKEND = ("pragmas", "transacao_imediata")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for opcao in OPCOES_DO_BACKEND:
+            params.pop(opcao, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for nome, valor in self.settings_dict["OPTIONS"].get("pragmas", {}).items():
+            conn.execute(f"PRAGMA {nome} = {valor}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.settings_dict["OPTIONS"].get("transacao_imediata"):
+            self.cursor().execute("BEGIN IMMEDIATE")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,51 @@
+"""
+Tag {% imagem_responsiva %}: um <picture> com as variantes WebP e JPEG geradas pelo gera_imagens, para o navegador
+escolher a menor que serve para a tela. Sem o variantes.json (gera_imagens ainda não rodou) a tag gera um <img> com a
+imagem original.
+"""
+import json
+import os
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def variantes():
+    try:
+        with open(os.path.join(settings.IMAGENS_VARIANTES_DIR, "variantes.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _srcset(lista, formato):
+    return ", ".join(f"{static(variante[formato])} {variante['largura']}w" for variante in lista)
+
+
+@register.simple_tag
+def imagem_responsiva(nome, alt, sizes="100vw", classe=""):
+    """
+    Args:
+        nome (str): arquivo da imagem em static/
+        alt (str): texto alternativo
+        sizes (str): largura em que a imagem é mostrada (atributo sizes), usada pelo navegador para escolher a variante
+        classe (str): classe CSS do <img>
+    """
+    imagem = variantes().get(nome)
+    if imagem is None:
+        return format_html('<img class="{}" src="{}" alt="{}">', classe, static(nome), alt)
+    lista = imagem["variantes"]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}">'
+        '</picture>',
+        _srcset(lista, "webp"), sizes,
+        classe, static(lista[-1]["jpeg"]), _srcset(lista, "jpeg"), sizes, imagem["largura"], imagem["altura"], alt,
+    )
@@ -0,0 +1,273 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+
+from PIL import Image
+
+from . import catalogo, metricas, miniaturas, sessoes
+from .models import Example, Livro
+
+SENHA = "senha-de-teste-123"
+
+
+@override_settings(
+    # sem o collectstatic o manifesto não existe, e com o DEBUG desligado o {% static %} precisaria dele
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "testes"},
+        "sessoes": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "testes-sessoes"},
+    },
+    SESSION_ENGINE="mynewdjangoapp.sessoes",
+    AUTHENTICATION_BACKENDS=["mynewdjangoapp.autenticacao.BackendComCache"],
+    SESSOES_PROCESSO_UNICO=True,
+)
+class TesteDoSite(TransactionTestCase):
+    """
+    TransactionTestCase porque as leituras vão pela conexão "leitura" (roteador.py), que não vê o que está numa
+    transação aberta na "default".
+    """
+    databases = {"default", "leitura"}
+
+    def setUp(self):
+        caches["default"].clear()
+        caches["sessoes"].clear()
+        sessoes._pendentes.clear()
+
+    def assertSemConsultas(self):
+        return _SemConsultas(self)
+
+
+class _SemConsultas:
+    # assertNumQueries(0) nas duas conexões ao mesmo arquivo
+    def __init__(self, teste):
+        self.contextos = [teste.assertNumQueries(0, using=alias) for alias in ("default", "leitura")]
+
+    def __enter__(self):
+        for contexto in self.contextos:
+            contexto.__enter__()
+
+    def __exit__(self, *erro):
+        for contexto in reversed(self.contextos):
+            contexto.__exit__(*erro)
+
+
+class SessoesTest(TesteDoSite):
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = User.objects.create_user("ana", password=SENHA)
+
+    def _login(self):
+        response = self.client.post("/accounts/login/", {"username": "ana", "password": SENHA})
+        self.assertEqual(response.status_code, 302)
+        return self.client.cookies["sessionid"].value
+
+    def test_pagina_logado_sem_consultas(self):
+        self._login()
+        self.client.get("/") # primeira leitura da sessão e do usuário depois do login
+        with self.assertSemConsultas():
+            response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+
+    def test_login_gravado_no_banco_na_hora(self):
+        chave = self._login()
+        # o que outro processo vê: nem o cache nem a fila deste processo
+        caches["sessoes"].clear()
+        sessoes._pendentes.clear()
+        dados = Session.objects.get(session_key=chave).get_decoded()
+        self.assertEqual(dados["_auth_user_id"], str(self.usuario.pk))
+        self.assertTrue(self.client.get("/").wsgi_request.user.is_authenticated)
+
+    def test_gravacao_atrasada_nao_traz_de_volta_sessao_apagada(self):
+        chave = self._login()
+        sessao = sessoes.SessionStore(chave)
+        sessao["visitas"] = 1
+        sessao.save()
+        self.assertNotIn("visitas", Session.objects.get(session_key=chave).get_decoded())
+        pendente = sessoes._pendentes[chave]
+        Session.objects.filter(session_key=chave).delete() # logout feito por outro processo
+        sessoes._pendentes[chave] = pendente
+        self.assertEqual(sessoes.grava_pendentes(), 1)
+        self.assertFalse(Session.objects.filter(session_key=chave).exists())
+
+    def test_troca_de_senha_derruba_as_outras_sessoes(self):
+        outro = self.client_class()
+        outro.login(username="ana", password=SENHA)
+        self.assertTrue(outro.get("/").wsgi_request.user.is_authenticated)
+        self.usuario.set_password("outra-senha-456")
+        self.usuario.save()
+        self.assertFalse(outro.get("/").wsgi_request.user.is_authenticated)
+
+
+@override_settings(PAGINA_INICIAL_CACHE_SEGUNDOS=600)
+class PaginaInicialTest(TesteDoSite):
+
+    def setUp(self):
+        super().setUp()
+        User.objects.create_user("ana", password=SENHA)
+
+    def test_etag_igual_devolve_304(self):
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        response = self.client.get("/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_diferente_devolve_a_pagina(self):
+        response = self.client.get("/", HTTP_IF_NONE_MATCH='"outra-versao"')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+
+    def test_logado_recebe_private(self):
+        self.client.login(username="ana", password=SENHA)
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_vary_cookie_em_todas_as_respostas(self):
+        anonima = self.client.get("/")
+        nao_modificada = self.client.get("/", HTTP_IF_NONE_MATCH=anonima["ETag"])
+        self.client.login(username="ana", password=SENHA)
+        logada = self.client.get("/")
+        for response in (anonima, nao_modificada, logada):
+            self.assertIn("Cookie", response["Vary"])
+
+    def test_pagina_de_logado_nao_vai_para_o_cache(self):
+        self.client.login(username="ana", password=SENHA)
+        self.client.get("/")
+        self.assertIsNone(caches["default"].get("pagina_inicial"))
+        anonimo = self.client_class()
+        response = anonimo.get("/")
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("private", response["Cache-Control"])
+
+    def test_logado_nao_recebe_a_pagina_anonima_do_cache(self):
+        etag = self.client_class().get("/")["ETag"]
+        self.client.login(username="ana", password=SENHA)
+        response = self.client.get("/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+
+class LivroAleatorioTest(TesteDoSite):
+
+    def setUp(self):
+        super().setUp()
+        Livro.objects.all().delete()
+        Livro.objects.create(titulo="Dom Casmurro", descricao="Machado de Assis")
+        catalogo.invalidar()
+
+    def test_sem_consultas_com_o_catalogo_carregado(self):
+        self.client.get("/livroaleatorio") # carrega o catálogo
+        with self.assertSemConsultas():
+            response = self.client.get("/livroaleatorio")
+        self.assertEqual(response.json(), {"titulo": "Dom Casmurro", "descricao": "Machado de Assis"})
+
+    def test_livro_novo_invalida_o_catalogo(self):
+        self.client.get("/livroaleatorio")
+        Livro.objects.all().delete()
+        Livro.objects.create(titulo="Iracema", descricao="José de Alencar")
+        self.assertEqual(self.client.post("/livroaleatorio").json()["titulo"], "Iracema")
+
+    def test_sem_livros(self):
+        Livro.objects.all().delete()
+        self.assertEqual(self.client.get("/livroaleatorio").status_code, 404)
+
+
+def _imagem(nome, largura=800, altura=600):
+    saida = io.BytesIO()
+    Image.new("RGB", (largura, altura), "navy").save(saida, "JPEG")
+    return SimpleUploadedFile(nome, saida.getvalue(), content_type="image/jpeg")
+
+
+class MiniaturasTest(TesteDoSite):
+    """
+    Gera as variantes dentro do save (MINIATURAS_SINCRONAS), sem a thread da fila.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracao = override_settings(MINIATURAS_SINCRONAS=True, MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def _existe(self, nome):
+        return os.path.exists(os.path.join(self.media, nome))
+
+    def test_gera_miniatura_e_webp(self):
+        exemplo = Example.objects.create(name="capa", image=_imagem("capa.jpg"))
+        exemplo.refresh_from_db()
+        with Image.open(exemplo.miniatura.path) as miniatura:
+            self.assertEqual((miniatura.format, miniatura.width), ("WEBP", miniaturas.LARGURA_MINIATURA))
+        with Image.open(exemplo.imagem_webp.path) as webp:
+            self.assertEqual((webp.format, webp.width), ("WEBP", 800))
+        self.assertEqual(exemplo.imagem_exibida(), exemplo.imagem_webp)
+
+    def test_trocar_a_imagem_apaga_as_variantes_antigas(self):
+        exemplo = Example.objects.create(name="capa", image=_imagem("capa.jpg"))
+        exemplo.refresh_from_db()
+        antigas = [exemplo.miniatura.name, exemplo.imagem_webp.name]
+        exemplo.image = _imagem("nova.jpg", largura=400)
+        exemplo.save()
+        exemplo.refresh_from_db()
+        self.assertFalse(any(self._existe(nome) for nome in antigas))
+        self.assertTrue(self._existe(exemplo.miniatura.name) and self._existe(exemplo.imagem_webp.name))
+
+    def test_erro_na_fila_vai_para_o_log(self):
+        exemplo = Example.objects.create(name="capa", image=_imagem("capa.jpg"))
+        with open(exemplo.image.path, "wb") as f:
+            f.write(b"isto nao e uma imagem")
+        with self.assertLogs("mynewdjangoapp.miniaturas", "ERROR"):
+            miniaturas._gera_variantes_na_fila(exemplo.pk)
+
+
+@override_settings(METRICAS_IPS=["127.0.0.1"])
+class MetricasTest(TesteDoSite):
+
+    def _conexao_nova(self):
+        conexao = connections.create_connection("default")
+        self.addCleanup(conexao.close)
+        conexao.ensure_connection() # dispara o connection_created
+        return conexao
+
+    def test_ip_fora_da_lista_nao_le_as_metricas(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.7")
+        self.assertEqual(response.status_code, 403)
+
+    def test_ip_da_lista_recebe_o_formato_do_prometheus(self):
+        self.client.get("/livroaleatorio")
+        response = self.client.get("/metrics", REMOTE_ADDR="127.0.0.1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        texto = response.content.decode()
+        self.assertIn("# TYPE django_requisicao_segundos histogram\n", texto)
+        self.assertIn('django_requisicao_segundos_count{rota="/livroaleatorio",metodo="GET"}', texto)
+
+    def test_desligadas_o_middleware_sai_da_pilha(self):
+        with override_settings(METRICAS_ATIVAS=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                metricas.MetricasMiddleware(lambda request: None)
+
+    def test_desligadas_as_conexoes_nao_medem_as_consultas(self):
+        with override_settings(METRICAS_ATIVAS=False):
+            self.assertNotIn(metricas._sql_medido, self._conexao_nova().execute_wrappers)
+        with override_settings(METRICAS_ATIVAS=True):
+            self.assertIn(metricas._sql_medido, self._conexao_nova().execute_wrappers)
@@ -14,15 +14,36 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.contrib import admin
-from django.urls import path, include
-from . import views
+from django.urls import path, include, re_path
+from . import metricas, views
+
+if settings.VIEWS_ASSINCRONAS:
+    PaginaInicial, BotaoView = views.PaginaInicialAsync, views.BotaoViewAsync
+else:
+    PaginaInicial, BotaoView = views.PaginaInicial, views.BotaoView
 
 urlpatterns = [
-    path('', views.PaginaInicial.as_view()),
-    path('livroaleatorio', views.BotaoView.as_view()),
+    path('', PaginaInicial.as_view()),
+    path('livroaleatorio', BotaoView.as_view()),
+    path('metrics', metricas.exporta_metricas),
 
 
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
-]
\ No newline at end of file
+]
+
+# arquivos enviados, em desenvolvimento (static() não gera rotas com o DEBUG desligado)
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if settings.DEBUG:
+    # em desenvolvimento os estáticos saem direto de static/ (o runserver já faz isso, aqui vale para gunicorn e uvicorn)
+    urlpatterns += staticfiles_urlpatterns()
+else:
+    # em produção eles saem do STATIC_ROOT
+    urlpatterns += [
+        re_path(r'^%s(?P<caminho>.*)$' % settings.STATIC_URL.lstrip('/'), views.arquivo_estatico),
+    ]
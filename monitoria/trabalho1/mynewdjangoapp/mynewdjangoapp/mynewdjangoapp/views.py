@@ -1,26 +1,151 @@
+import hashlib
+import time
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse, JsonResponse
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import serve
 from django.views.generic import CreateView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from . import models
+from . import catalogo, models
+
+async def _usuario_logado(request):
+   """
+   request.user lê a sessão e o usuário (do cache ou, se não estão lá, do banco), o que não pode rodar direto no event
+   loop. Sem cookie de sessão o visitante é anônimo e não há nada para ler, então só quem tem o cookie paga a ida para
+   uma thread.
+   """
+   if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+      return False
+   return await sync_to_async(lambda: request.user.is_authenticated)()
+
+def _cache_sem_io():
+   # o cache em memória não faz I/O e pode ser usado direto no event loop, os outros (arquivo) vão para uma thread
+   return isinstance(caches["default"], LocMemCache)
+
+def _nova_pagina(conteudo):
+   return {
+      "conteudo": conteudo,
+      "etag": '"%s"' % hashlib.md5(conteudo, usedforsecurity=False).hexdigest(),
+      "modificado": int(time.time()),
+   }
+
+def _resposta_anonima(request, pagina):
+   response = HttpResponse(pagina["conteudo"])
+   response["ETag"] = pagina["etag"]
+   response["Last-Modified"] = http_date(pagina["modificado"])
+   patch_cache_control(response, no_cache=True) # o navegador guarda a página, mas confirma com o servidor a cada visita
+   return get_conditional_response(request, etag=pagina["etag"], last_modified=pagina["modificado"], response=response)
+
+def _resposta_renderizada(conteudo, logado):
+   response = HttpResponse(conteudo)
+   if logado:
+      patch_cache_control(response, private=True)
+   return response
 
 class PaginaInicial(TemplateView):
+   """
+   Página inicial. Para visitantes não logados, a página renderizada fica no cache (por
+   PAGINA_INICIAL_CACHE_SEGUNDOS) com ETag e Last-Modified, e quem já tem a página recebe 304. Para usuários logados
+   a página é sempre renderizada e não é guardada em nenhum cache compartilhado, então a versão de um usuário nunca é
+   servida para outro. A página anônima não pode ter nada do visitante (como {% csrf_token %}), ela é a mesma para todos.
+   """
    template_name = "index.html"
+   chave_cache = "pagina_inicial"
+
+   def _renderiza(self, **kwargs):
+      # renderiza aqui e devolve HttpResponse: com um TemplateResponse o Django renderiza depois da view (no ASGI, numa thread)
+      return self.render_to_response(self.get_context_data(**kwargs)).render().content
+
+   def get(self, request, *args, **kwargs):
+      logado = request.user.is_authenticated
+      if logado or settings.PAGINA_INICIAL_CACHE_SEGUNDOS <= 0:
+         response = _resposta_renderizada(self._renderiza(**kwargs), logado)
+      else:
+         pagina = cache.get(self.chave_cache)
+         if pagina is None:
+            pagina = _nova_pagina(self._renderiza(**kwargs))
+            cache.set(self.chave_cache, pagina, settings.PAGINA_INICIAL_CACHE_SEGUNDOS)
+         response = _resposta_anonima(request, pagina)
+      patch_vary_headers(response, ["Cookie"]) # a resposta muda com o login
+      return response
+
+class PaginaInicialAsync(PaginaInicial):
+   """
+   Versão assíncrona da PaginaInicial, usada quando o app roda num servidor ASGI (VIEWS_ASSINCRONAS).
+   """
+   async def get(self, request, *args, **kwargs):
+      logado = await _usuario_logado(request)
+      if logado or settings.PAGINA_INICIAL_CACHE_SEGUNDOS <= 0:
+         response = _resposta_renderizada(self._renderiza(**kwargs), logado)
+      else:
+         pagina = cache.get(self.chave_cache) if _cache_sem_io() else await cache.aget(self.chave_cache)
+         if pagina is None:
+            pagina = _nova_pagina(self._renderiza(**kwargs))
+            if _cache_sem_io():
+               cache.set(self.chave_cache, pagina, settings.PAGINA_INICIAL_CACHE_SEGUNDOS)
+            else:
+               await cache.aset(self.chave_cache, pagina, settings.PAGINA_INICIAL_CACHE_SEGUNDOS)
+         response = _resposta_anonima(request, pagina)
+      patch_vary_headers(response, ["Cookie"])
+      return response
+
+def _resposta_livro(livro):
+   if livro is None:
+      return JsonResponse({"erro": "nenhum livro cadastrado"}, status=404)
+   return JsonResponse(livro)
+
 class BotaoView(View):
+    def get(self, request, *args, **kwargs):
+        return _resposta_livro(recomendar_livro())
+
     def post(self, request, *args, **kwargs):
-        return HttpResponse('use o livro 10')
+        return self.get(request, *args, **kwargs)
 
-import random
+class BotaoViewAsync(View):
+    """
+    Versão assíncrona da BotaoView: com o catálogo carregado, o request não sai do event loop.
+    """
+    async def get(self, request, *args, **kwargs):
+        return _resposta_livro(await catalogo.alivro_aleatorio())
+
+    async def post(self, request, *args, **kwargs):
+        return await self.get(request, *args, **kwargs)
 
 def recomendar_livro():
-    livros = [
-        {"titulo": "Telefone Preto", "descricao": "A luta de um garoto sequestrado contra um serial killer em um suspense de tirar o fôlego."},
-        {"titulo": "O Castelo Animado", "descricao": "A mágica jornada de Sophie para quebrar uma maldição e descobrir o amor no castelo do mago Howl."},
-        {"titulo": "Blue Period", "descricao": "Yatora descobre sua paixão pela arte e embarca em um intenso desafio rumo à faculdade de artes."},
-        {"titulo": "A Mecânica do Amor", "descricao": "Uma mulher independente encontra um novo significado para o amor com um misterioso mecânico."},
-        {"titulo": "Imperfeitos", "descricao": "Celestine desafia um sistema que exige perfeição, tornando-se símbolo de resistência."},
-        {"titulo": "Melhor do que nos Filmes", "descricao": "Liz descobre que o amor verdadeiro pode ser inesperado, superando até mesmo os clichês dos livros."},
-    ]
-
-    livro_recomendado = random.choice(livros)
-    return f"Recomendamos o livro: {livro_recomendado['titulo']} - {livro_recomendado['descricao']}"
\ No newline at end of file
+    """
+    Livro aleatório do catálogo em memória (dict com titulo e descricao), sem consultas ao banco depois que o
+    catálogo foi carregado.
+    """
+    return catalogo.livro_aleatorio()
+
+def arquivo_estatico(request, caminho):
+    """
+    Serve os arquivos do STATIC_ROOT (quando o DEBUG está desligado). Os nomes com hash do manifesto vão com cache de
+    um ano, já que o conteúdo de uma URL nunca muda, e a cópia .br ou .gz é usada se o navegador aceita.
+    """
+    aceitas = request.headers.get("Accept-Encoding", "")
+    arquivo = caminho
+    for extensao, codificacao in ((".br", "br"), (".gz", "gzip")):
+        if codificacao in aceitas and staticfiles_storage.exists(caminho + extensao):
+            arquivo = caminho + extensao
+            break
+    response = serve(request, arquivo, document_root=settings.STATIC_ROOT)
+    if caminho in _nomes_com_hash():
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+@lru_cache(maxsize=None)
+def _nomes_com_hash():
+    return frozenset(staticfiles_storage.hashed_files.values())
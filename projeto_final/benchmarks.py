@@ -0,0 +1,93 @@
+"""
+Benchmarks do projeto final, rodam sem acesso à rede com dados sintéticos no mesmo formato da API do IPEA.
+
+Uso:
+   python3 benchmarks.py
+"""
+import tracemalloc, tempfile, time, shutil
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from projeto_final import DataPointStore, CityIndex, CSV_CITY_INFO_PATH, MUNICIPALITY_SCOPE
+
+NUM_RECORDS:int = 5570 * 34 #todos os municípios em todos os anos da série (1989-2022)
+UF_NAMES:list[str] = [f"UF {i}" for i in range(27)]
+
+@dataclass
+class DataPoint():
+   """
+   Formato antigo dos dados: um objeto Python (com __dict__) por registro.
+   """
+   valor:float
+   ano:int
+   cod_munic:int
+   uf:str
+
+def __synthetic_columns(num_records:int)->tuple[np.ndarray,np.ndarray,np.ndarray,np.ndarray]:
+   rng = np.random.default_rng(0)
+   valor = rng.random(num_records) * 50
+   ano = rng.integers(1989, 2023, num_records)
+   cod_munic = rng.integers(1100015, 5300108, num_records)
+   uf_codes = rng.integers(0, len(UF_NAMES), num_records)
+   return valor, ano, cod_munic, uf_codes
+
+def bench_record_memory(num_records:int = NUM_RECORDS)->None:
+   """
+   Compara a memória por registro de uma lista de objetos DataPoint com a de um DataPointStore.
+   """
+   valor, ano, cod_munic, uf_codes = __synthetic_columns(num_records)
+   valor_list, ano_list, cod_list, uf_list = valor.tolist(), ano.tolist(), cod_munic.tolist(), uf_codes.tolist()
+
+   tracemalloc.start()
+   data_points = [
+      DataPoint(valor=v, ano=int(a), cod_munic=int(c), uf=UF_NAMES[u]) #int() cria objetos novos, como o parsing da API fazia
+      for v, a, c, u in zip(valor_list, ano_list, cod_list, uf_list)
+   ]
+   list_bytes = tracemalloc.get_traced_memory()[0]
+   tracemalloc.stop()
+   del data_points
+
+   store = DataPointStore(valor, ano, cod_munic, uf_codes, UF_NAMES) #a memória do store é só a das colunas
+
+   print(f"Memória por registro ({num_records} registros):")
+   print(f"   list[DataPoint]: {list_bytes / num_records:.1f} bytes")
+   print(f"   DataPointStore:  {store.nbytes / num_records:.1f} bytes")
+
+def bench_city_index(repeat:int = 20)->None:
+   """
+   Compara o tempo para ter o índice código do município -> estado: leitura do CSV com o pandas (caminho antigo),
+   geração do índice binário (primeira execução) e leitura do índice binário com memory map (execuções seguintes).
+   """
+   def best_time(function)->float:
+      times:list[float] = []
+      for _ in range(repeat):
+         start = time.perf_counter()
+         function()
+         times.append(time.perf_counter() - start)
+      return min(times)
+
+   def read_csv_index()->None:
+      df = pd.read_csv(CSV_CITY_INFO_PATH, usecols=["nome_uf","codigo_municipio"])
+      df.set_index("codigo_municipio", inplace=True)
+      df.index = df.index.astype(int)
+
+   index_dir:str = tempfile.mkdtemp()
+   try:
+      def cold_load()->None:
+         shutil.rmtree(index_dir, ignore_errors=True)
+         CityIndex.load(MUNICIPALITY_SCOPE, index_dir=index_dir)
+
+      csv_time = best_time(read_csv_index)
+      cold_time = best_time(cold_load)
+      warm_time = best_time(lambda: CityIndex.load(MUNICIPALITY_SCOPE, index_dir=index_dir))
+   finally:
+      shutil.rmtree(index_dir, ignore_errors=True)
+
+   print(f"Carregamento do índice de municípios (melhor de {repeat}):")
+   print(f"   pd.read_csv:              {csv_time * 1000:.2f} ms")
+   print(f"   índice binário (frio):    {cold_time * 1000:.2f} ms")
+   print(f"   índice binário (quente):  {warm_time * 1000:.2f} ms")
+
+if __name__ == "__main__":
+   bench_record_memory()
+   bench_city_index()
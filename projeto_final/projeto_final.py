@@ -1,11 +1,35 @@
-import requests, os 
+from __future__ import annotations #as anotações de tipo não são avaliadas, então não precisam das libs importadas
+import os, json, gzip, time, threading, codecs, hashlib, argparse
 from enum import Enum
-from dataclasses import dataclass
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
 
-BASE_URL:str = "https://www.ipea.gov.br/atlasviolencia/" #url básico da API
+#pandas, numpy, pyarrow, matplotlib e requests demoram para importar, então eles só são importados dentro das funções
+#que usam eles. Assim o --help e a listagem das séries rodam em dezenas de milissegundos
+if TYPE_CHECKING:
+   import requests
+   import pandas as pd
+   import numpy as np
+   import pyarrow as pa
+
+BASE_URL:str = os.environ.get("IPEA_API_URL","https://www.ipea.gov.br/atlasviolencia/") #url básico da API, pode ser trocado por um servidor local
+STATE_SCOPE:int = 3 #abrangência dos dados da API para cada estado
+MUNICIPALITY_SCOPE:int = 4 #abrangência dos dados da API para cada município
+
+MAX_CONCURRENT_REQUESTS:int = 4 #número máximo de requests simultâneas à API
+REQUEST_TIMEOUT_SECONDS:tuple[float,float] = (10, 120) #timeout de conexão e de leitura de cada request
+REQUEST_RETRIES:int = 3 #tentativas extras em caso de erro de conexão ou erro 429/5xx, com backoff exponencial
+STREAM_CHUNK_BYTES:int = 64 * 1024 #tamanho dos pedaços lidos da resposta no modo streaming
+
+CACHE_DIR:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_api") #diretório do cache das respostas da API
+CACHE_TTL_SECONDS:int = 30 * 24 * 60 * 60 #os dados do Atlas da Violência mudam no máximo uma vez por ano, 30 dias é seguro
+CACHE_MAX_BYTES:int = 256 * 1024 * 1024 #tamanho máximo do cache no disco
+AGGREGATES_DIR:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".aggregates") #diretório das médias por estado e ano já calculadas
+CSV_CITY_INFO_PATH:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "info_municipios_ibge.csv") #arquivo csv extraido do IBGE com informações sobre cidades do Brasil
+CITY_INDEX_DIR:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".city_index") #índice binário código -> estado gerado a partir do CSV
+
+OLDEST_YEAR_IN_SERIES:int = 1989 #constantes para os anos de início e fim das séries históricas
+MOST_RECENT_YEAR_IN_SERIES:int = 2022
 
 class TimeSeries(Enum):
    """
@@ -30,78 +54,841 @@ class TimeSeries(Enum):
       "id": 52
    }
 
-@dataclass
-class DataPoint():
+class ResponseCache():
    """
-   o decorator dataclass gera automaticamente métodos padrões (__init__ entre outros) para a classe e indica que a
-   classe tem o propósito principal de armazenar dados de forma estruturada. Essa classe representa os dados sobre uma série histórica em um município.
-   com todos os campos que serão necessários para transformar ele em um dataframe para análises nos dados.
+   Cache persistente no disco para as respostas da API do IPEA. Cada resposta é salva como JSON comprimido com gzip
+   (um arquivo .json.gz) e um arquivo .meta.json com o ETag, Last-Modified e o horário em que a resposta foi baixada.
+
+   Enquanto uma entrada estiver dentro do TTL ela é retornada sem nenhuma chamada de rede, depois disso ela é revalidada
+   com uma request condicional (If-None-Match/If-Modified-Since). Quando o cache passa do tamanho máximo as entradas
+   usadas há mais tempo são removidas.
    """
-   valor:float
-   ano:int
-   cod_munic:int
-   uf:str
 
+   def __init__(self, cache_dir:str = CACHE_DIR, ttl_seconds:float = CACHE_TTL_SECONDS, max_bytes:int = CACHE_MAX_BYTES):
+      self.cache_dir = cache_dir
+      self.ttl_seconds = ttl_seconds
+      self.max_bytes = max_bytes
+      self.__lock = threading.Lock() #o cache é compartilhado pelas threads das buscas concorrentes
+
+   def __paths(self, key:str)->tuple[str,str]:
+      """
+      Retorna os caminhos do arquivo de dados e do arquivo de metadados de uma chave do cache.
+      """
+      safe_key:str = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+      base:str = os.path.join(self.cache_dir, safe_key)
+      return base + ".json.gz", base + ".meta.json"
+
+   def get(self, key:str)->tuple[list[dict] | None, dict]:
+      """
+      Lê uma entrada do cache.
+
+      Args:
+         key (str): chave da entrada, ex: "valores-series_20_4"
+
+      Return:
+         (tuple[list[dict] | None, dict]): o payload salvo (ou None se não existir) e os metadados da entrada
+      """
+      data_path, _ = self.__paths(key)
+      meta:dict | None = self.get_meta(key)
+      if meta is None:
+         return None, {}
+      try:
+         with open(data_path, "rb") as f:
+            payload:list[dict] = json.loads(gzip.decompress(f.read()))
+      except (OSError, ValueError): #entrada corrompida, trata como miss
+         return None, {}
+
+      os.utime(data_path) #marca o uso da entrada para a remoção por LRU
+      return payload, meta
+
+   def get_meta(self, key:str)->dict | None:
+      """
+      Retorna os metadados de uma entrada do cache, ou None se a entrada não existir.
+      """
+      data_path, meta_path = self.__paths(key)
+      try:
+         with open(meta_path, "r", encoding="utf-8") as f:
+            meta:dict = json.load(f)
+      except (OSError, ValueError):
+         return None
+      return meta if os.path.exists(data_path) else None
+
+   def iter_body(self, key:str, chunk_size:int = STREAM_CHUNK_BYTES)->Iterator[bytes]:
+      """
+      Lê o corpo salvo de uma entrada em pedaços de chunk_size bytes, descomprimindo aos poucos, sem carregar
+      a resposta inteira na memória.
+      """
+      data_path, _ = self.__paths(key)
+      os.utime(data_path) #marca o uso da entrada para a remoção por LRU
+      with gzip.open(data_path, "rb") as f:
+         while chunk := f.read(chunk_size):
+            yield chunk
+
+   def is_fresh(self, meta:dict)->bool:
+      """
+      Retorna se uma entrada (pelos seus metadados) ainda está dentro do TTL.
+      """
+      return time.time() - meta.get("fetched_at", 0) < self.ttl_seconds
+
+   def put(self, key:str, body:bytes, etag:str|None = None, last_modified:str|None = None)->None:
+      """
+      Salva uma resposta da API no cache e remove entradas antigas se o cache passar do tamanho máximo.
+
+      Args:
+         key (str): chave da entrada
+         body (bytes): corpo da resposta da API (JSON)
+         etag (str | None): header ETag da resposta, se existir
+         last_modified (str | None): header Last-Modified da resposta, se existir
+      """
+      os.makedirs(self.cache_dir, exist_ok=True)
+      data_path, meta_path = self.__paths(key)
+      tmp_path:str = f"{data_path}.{threading.get_ident()}.tmp"
+      compressed:bytes = gzip.compress(body, compresslevel=6) #o zlib libera o GIL, então as threads das outras requests não ficam paradas
+      with open(tmp_path, "wb") as f: #escreve num arquivo temporário para não deixar entradas pela metade
+         f.write(compressed)
+      self.__commit(key, tmp_path, len(body), etag, last_modified)
+
+   def tee_body(self, key:str, chunks:Iterable[bytes], etag:str|None = None, last_modified:str|None = None)->Iterator[bytes]:
+      """
+      Repassa os pedaços do corpo de uma resposta e ao mesmo tempo grava eles comprimidos no cache. A entrada só é salva
+      quando o corpo inteiro foi lido, se a leitura parar no meio o arquivo temporário é descartado.
+
+      Args:
+         key (str): chave da entrada
+         chunks (Iterable[bytes]): pedaços do corpo da resposta da API
+         etag (str | None): header ETag da resposta, se existir
+         last_modified (str | None): header Last-Modified da resposta, se existir
 
-def __get_api_response(time_series:TimeSeries)->list[dict]:
+      Return:
+         (Iterator[bytes]): os mesmos pedaços recebidos
+      """
+      os.makedirs(self.cache_dir, exist_ok=True)
+      data_path, _ = self.__paths(key)
+      tmp_path:str = f"{data_path}.{threading.get_ident()}.tmp"
+      size:int = 0
+      try:
+         with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            for chunk in chunks:
+               f.write(chunk)
+               size += len(chunk)
+               yield chunk
+      except BaseException:
+         os.remove(tmp_path)
+         raise
+      self.__commit(key, tmp_path, size, etag, last_modified)
+
+   def __commit(self, key:str, tmp_path:str, size:int, etag:str|None, last_modified:str|None)->None:
+      """
+      Move o arquivo temporário para o lugar da entrada, grava os metadados e remove entradas antigas se preciso.
+      """
+      data_path, meta_path = self.__paths(key)
+      with self.__lock:
+         os.replace(tmp_path, data_path)
+         self.__write_meta(meta_path, {"etag": etag, "last_modified": last_modified, "fetched_at": time.time(), "size": size})
+         self.__evict()
+
+   def refresh(self, key:str, meta:dict)->None:
+      """
+      Renova o TTL de uma entrada que foi revalidada pelo servidor (resposta 304).
+      """
+      _, meta_path = self.__paths(key)
+      self.__write_meta(meta_path, {**meta, "fetched_at": time.time()})
+
+   def __write_meta(self, meta_path:str, meta:dict)->None:
+      with open(meta_path, "w", encoding="utf-8") as f:
+         json.dump(meta, f)
+
+   def __evict(self)->None:
+      """
+      Remove as entradas usadas há mais tempo até o tamanho total do cache ficar abaixo do máximo.
+      """
+      entries:list[tuple[float,int,str]] = [] #(último uso, tamanho, caminho)
+      for name in os.listdir(self.cache_dir):
+         if name.endswith(".json.gz"):
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+      total_size:int = sum(size for _, size, _ in entries)
+      for _, size, name in sorted(entries): #mais antigos primeiro
+         if total_size <= self.max_bytes:
+            break
+         data_path:str = os.path.join(self.cache_dir, name)
+         meta_path:str = data_path.removesuffix(".json.gz") + ".meta.json"
+         for path in (data_path, meta_path):
+            if os.path.exists(path):
+               os.remove(path)
+         total_size -= size
+
+API_CACHE = ResponseCache() #cache padrão usado pelas funções que chamam a API
+
+__session:requests.Session | None = None
+__session_lock = threading.Lock()
+
+def __get_session()->requests.Session:
    """
-   Faz uma request à API do IPEA atlas da violência dado um série histórica passada como argumento.
+   Retorna a sessão HTTP compartilhada por todas as chamadas à API, criando ela na primeira chamada.
+   A sessão mantém as conexões abertas (keep-alive) num pool do tamanho do limite de requests simultâneas
+   e refaz as requests que falharem por erro de conexão ou status 429/5xx com backoff exponencial.
+
+   Return:
+      (requests.Session): sessão HTTP compartilhada
+   """
+   import requests
+   from requests.adapters import HTTPAdapter
+   from urllib3.util.retry import Retry
+
+   global __session
+   with __session_lock:
+      if __session is None:
+         retry = Retry(
+            total=REQUEST_RETRIES,
+            backoff_factor=0.5, #espera 0.5s, 1s, 2s... entre as tentativas
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",)
+         )
+         adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS, max_retries=retry)
+         session = requests.Session()
+         session.mount("http://", adapter)
+         session.mount("https://", adapter)
+         __session = session
+      return __session
+
+class DataPointStore():
+   """
+   Armazena os dados de uma série histórica, um registro por município e ano, no formato de colunas (struct of arrays):
+   cada campo é um array tipado do NumPy ao invés de um objeto Python por registro. O estado (UF) de cada registro é
+   guardado como um código pequeno (int8) que indexa a lista uf_names, do mesmo jeito que uma coluna categórica do pandas.
+   """
+   __slots__ = ("valor", "ano", "cod_munic", "uf_codes", "uf_names")
+
+   def __init__(self, valor:np.ndarray, ano:np.ndarray, cod_munic:np.ndarray, uf_codes:np.ndarray, uf_names:list[str]):
+      import numpy as np
+
+      self.valor:np.ndarray = np.asarray(valor, dtype=np.float64)
+      self.ano:np.ndarray = np.asarray(ano, dtype=np.int16)
+      self.cod_munic:np.ndarray = np.asarray(cod_munic, dtype=np.int32)
+      self.uf_codes:np.ndarray = np.asarray(uf_codes, dtype=np.int8)
+      self.uf_names:list[str] = uf_names
+
+   def __len__(self)->int:
+      return len(self.valor)
+
+   @property
+   def nbytes(self)->int:
+      """
+      Memória usada pelas colunas, em bytes.
+      """
+      return self.valor.nbytes + self.ano.nbytes + self.cod_munic.nbytes + self.uf_codes.nbytes
+
+   def filter(self, mask:np.ndarray)->"DataPointStore":
+      """
+      Retorna um novo DataPointStore só com os registros em que mask é True.
+      """
+      return DataPointStore(self.valor[mask], self.ano[mask], self.cod_munic[mask], self.uf_codes[mask], self.uf_names)
+
+   def to_dataframe(self)->pd.DataFrame:
+      """
+      Converte os dados em um DataFrame com as colunas (valor,ano,cod_munic,uf) sem copiar as colunas: o DF usa os
+      mesmos arrays do NumPy e a coluna uf é categórica, usando os próprios códigos de UF.
+      """
+      import pandas as pd
+
+      uf = pd.Categorical.from_codes(self.uf_codes, categories=self.uf_names)
+      return pd.DataFrame(
+         {"valor": self.valor, "ano": self.ano, "cod_munic": self.cod_munic, "uf": uf},
+         copy=False
+      )
+
+class AggregateStore():
+   """
+   Armazena no disco as agregações por estado e ano (soma, contagem e média dos valores) de cada série histórica, para
+   não ter que chamar a API, ler o CSV do IBGE e refazer o groupby a cada execução.
+
+   Cada série/abrangência tem um diretório com uma partição por ano no formato Arrow IPC (ano_AAAA.arrow), lida com
+   memory map, e um manifest.json com uma impressão digital dos dados brutos de cada ano. Consultas por ano só leem as
+   partições dos anos pedidos e a atualização só reescreve as partições dos anos cujos dados mudaram.
+
+   Uma série atualizada há mais de max_age_seconds (o mesmo TTL do cache da API, por padrão) não é lida do store: ela
+   passa de novo pela API, que revalida a resposta com ETag/Last-Modified, e a atualização renova a idade do store.
+   """
+
+   def __init__(self, root_dir:str = AGGREGATES_DIR, max_age_seconds:float = CACHE_TTL_SECONDS):
+      self.root_dir = root_dir
+      self.max_age_seconds = max_age_seconds
+
+   def __series_dir(self, series_id:int, abrangencia:int)->str:
+      return os.path.join(self.root_dir, f"serie_{series_id}_abrangencia_{abrangencia}")
+
+   def __partition_path(self, series_id:int, abrangencia:int, year:int)->str:
+      return os.path.join(self.__series_dir(series_id, abrangencia), f"ano_{year}.arrow")
+
+   def __read_manifest(self, series_id:int, abrangencia:int)->dict | None:
+      try:
+         with open(os.path.join(self.__series_dir(series_id, abrangencia), "manifest.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+      except (OSError, ValueError):
+         return None
+
+   def read(self, series_id:int, abrangencia:int, years:list[int])->pd.DataFrame | None:
+      """
+      Lê as médias por estado e ano dos anos pedidos, lendo só as partições desses anos.
+
+      Args:
+         series_id (int): id da série histórica na API
+         abrangencia (int): abrangência dos dados da API
+         years (list[int]): anos consultados
+
+      Return:
+         (pd.DataFrame | None): DF agrupado por estado e ano com a coluna valor (média), no mesmo formato de
+         get_grouped_dataframe, ou None se a série ainda não foi materializada ou foi atualizada há mais de
+         max_age_seconds
+      """
+      import numpy as np
+      import pandas as pd
+      import pyarrow as pa
+
+      manifest:dict | None = self.__read_manifest(series_id, abrangencia)
+      if manifest is None or time.time() - manifest.get("refreshed_at", 0) >= self.max_age_seconds:
+         return None
+
+      stored_years:set[int] = {int(year) for year in manifest["years"]}
+      tables:list[pa.Table] = []
+      for year in sorted(set(years) & stored_years): #anos que não existem na série são ignorados
+         with pa.memory_map(self.__partition_path(series_id, abrangencia, year), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+         tables.append(table.append_column("ano", pa.array(np.full(table.num_rows, year, dtype=np.int16))))
+
+      if not tables:
+         return pd.DataFrame({"valor": pd.Series(dtype=np.float64)}, index=pd.MultiIndex.from_arrays([[], np.array([], dtype=np.int16)], names=["uf","ano"]))
+      df:pd.DataFrame = pa.concat_tables(tables).to_pandas()
+      return df.rename(columns={"media": "valor"}).set_index(["uf","ano"])[["valor"]].sort_index()
+
+   @staticmethod
+   def __fingerprint_years(data_points:DataPointStore)->dict[str,str]:
+      """
+      Calcula uma impressão digital dos dados brutos de cada ano, que não depende da ordem dos registros: a soma
+      (com overflow) dos hashes de cada registro e o número de registros do ano.
+
+      Return:
+         (dict[str,str]): impressão digital de cada ano (ano como texto, para salvar em JSON)
+      """
+      import numpy as np
+      import pandas as pd
+
+      if len(data_points) == 0:
+         return {}
+      row_hashes:np.ndarray = (
+         pd.util.hash_array(data_points.cod_munic) * np.uint64(31)
+         + pd.util.hash_array(data_points.valor)
+         + pd.util.hash_array(data_points.uf_codes) * np.uint64(17)
+      )
+      order:np.ndarray = np.argsort(data_points.ano, kind="stable")
+      years, starts, counts = np.unique(data_points.ano[order], return_index=True, return_counts=True)
+      sums:np.ndarray = np.add.reduceat(row_hashes[order], starts)
+      return {str(year): f"{hash_sum:016x}-{count}" for year, hash_sum, count in zip(years, sums, counts)}
+
+   @staticmethod
+   def __aggregate_by_state_and_year(data_points:DataPointStore)->pd.DataFrame:
+      """
+      Calcula a soma, a contagem (sem contar valores faltantes) e a média dos valores de cada estado em cada ano.
+
+      Return:
+         (pd.DataFrame): DF com as colunas (uf,ano,soma,contagem,media)
+      """
+      import numpy as np
+
+      df:pd.DataFrame = data_points.to_dataframe()
+      aggregates = df.groupby(["uf","ano"], observed=True)["valor"].agg(["sum","count"]).reset_index()
+      aggregates = aggregates.rename(columns={"sum": "soma", "count": "contagem"})
+      aggregates["uf"] = aggregates["uf"].astype(str)
+      aggregates["contagem"] = aggregates["contagem"].astype(np.int64)
+      aggregates["media"] = aggregates["soma"].where(aggregates["contagem"] > 0) / aggregates["contagem"]
+      return aggregates
+
+   def refresh(self, series_id:int, abrangencia:int, data_points:DataPointStore)->list[int]:
+      """
+      Atualiza as partições de uma série a partir dos dados brutos. Só os anos cujos dados mudaram (pela impressão
+      digital do manifest) têm as agregações recalculadas e reescritas, anos que sumiram dos dados são removidos.
+
+      Args:
+         series_id (int): id da série histórica na API
+         abrangencia (int): abrangência dos dados da API
+         data_points (DataPointStore): todos os dados da série, de todos os anos
+
+      Return:
+         (list[int]): anos que foram recalculados
+      """
+      import numpy as np
+      import pyarrow as pa
+
+      series_dir:str = self.__series_dir(series_id, abrangencia)
+      os.makedirs(series_dir, exist_ok=True)
+      manifest:dict = self.__read_manifest(series_id, abrangencia) or {"years": {}}
+      old_fingerprints:dict[str,str] = manifest["years"]
+      new_fingerprints:dict[str,str] = self.__fingerprint_years(data_points)
+
+      changed_years:list[int] = [int(year) for year, fingerprint in new_fingerprints.items() if old_fingerprints.get(year) != fingerprint]
+      if changed_years:
+         changed_data:DataPointStore = data_points.filter(np.isin(data_points.ano, changed_years))
+         aggregates:pd.DataFrame = self.__aggregate_by_state_and_year(changed_data)
+         for year, year_df in aggregates.groupby("ano"):
+            table = pa.Table.from_pandas(year_df.drop(columns="ano"), preserve_index=False)
+            path:str = self.__partition_path(series_id, abrangencia, int(year))
+            with pa.OSFile(path + ".tmp", "wb") as sink: #Arrow IPC sem compressão, para poder ser lido com memory map
+               with pa.ipc.new_file(sink, table.schema) as writer:
+                  writer.write_table(table)
+            os.replace(path + ".tmp", path)
+
+      for year in set(old_fingerprints) - set(new_fingerprints): #anos que não estão mais nos dados
+         path = self.__partition_path(series_id, abrangencia, int(year))
+         if os.path.exists(path):
+            os.remove(path)
+
+      with open(os.path.join(series_dir, "manifest.json"), "w", encoding="utf-8") as f:
+         json.dump({"years": new_fingerprints, "refreshed_at": time.time()}, f)
+      return sorted(changed_years)
+
+AGGREGATE_STORE = AggregateStore() #store padrão das agregações por estado e ano
+
+def __conditional_headers(meta:dict)->dict:
+   """
+   Monta os headers de uma request condicional (If-None-Match/If-Modified-Since) a partir dos metadados de uma entrada do cache.
+   """
+   headers:dict = {}
+   if meta.get("etag"):
+      headers["If-None-Match"] = meta["etag"]
+   if meta.get("last_modified"):
+      headers["If-Modified-Since"] = meta["last_modified"]
+   return headers
+
+def __cached_api_get(url_path:str, cache_key:str, cache:ResponseCache | None)->list[dict]:
+   """
+   Faz um GET na API do IPEA passando pelo cache no disco. Se a entrada do cache estiver dentro do TTL nenhuma request
+   é feita, se ela estiver expirada a request é condicional (ETag/Last-Modified) e uma resposta 304 reaproveita o cache.
 
    Args:
-      time_series (TimeSeries): Objeto que dita qual dado/série histórica será buscado na API
-   
+      url_path (str): caminho da API depois do BASE_URL
+      cache_key (str): chave da resposta no cache
+      cache (ResponseCache | None): cache usado, None desativa o cache
+
    Return:
-      (list[dict]): retorno da API, consiste em uma lista de dicionários, cada dict tem as chaves: (id,periodo,valor,cod)
+      (list[dict]): resposta da API convertida de JSON
    """
-   
-   id:int = time_series.value["id"]
-   SERIES_URL = f"api/v1/valores-series/{id}/4" #20 é o id do tema de taxa de homicídios e 4 é a abrangencia dos dados para cada município
-   path = BASE_URL + SERIES_URL
-   response = requests.get(path)
+   cached_payload:list[dict] | None = None
+   meta:dict = {}
+   if cache is not None:
+      cached_payload, meta = cache.get(cache_key)
+      if cached_payload is not None and cache.is_fresh(meta):
+         return cached_payload #zero chamadas de rede
+
+   headers:dict = __conditional_headers(meta) if cached_payload is not None else {} #revalida a entrada expirada
+   response = __get_session().get(BASE_URL + url_path, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
+   if response.status_code == 304 and cached_payload is not None:
+      cache.refresh(cache_key, meta) #servidor confirmou que os dados não mudaram
+      return cached_payload
    if response.status_code != 200:
          raise RuntimeError(f"Falha na request, erro: {response.status_code}")
    response.encoding = 'utf-8'
-   return response.json()
+   payload:list[dict] = response.json()
+
+   if cache is not None:
+      cache.put(cache_key, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+   return payload
 
-def __get_state_from_city_code(df:pd.DataFrame,city_code:int)->str:
+def __cached_api_stream(url_path:str, cache_key:str, cache:ResponseCache | None)->tuple[Iterator[bytes], int | None]:
    """
-   Dado um df com os estados associados a cada código de município (df que veio do CSV do IBGE sobre municípios),
-   e um código de cidade, retorna o nome do estado desse município.
+   Versão em streaming de __cached_api_get: ao invés de converter a resposta inteira de JSON, retorna um iterador
+   com os pedaços do corpo da resposta, vindos do cache no disco ou da rede (e gravados no cache enquanto são lidos).
 
    Args:
-      df (pd.DataFrame): df do pandas com os nomes dos estados associados a cada código do município de um dado
-      city_code (int): código do município
-   
+      url_path (str): caminho da API depois do BASE_URL
+      cache_key (str): chave da resposta no cache
+      cache (ResponseCache | None): cache usado, None desativa o cache
+
    Return:
-      (str): nome do estado em que o município do código se localiza 
+      (tuple[Iterator[bytes], int | None]): iterador com os pedaços do corpo e o tamanho do corpo em bytes, se for conhecido
    """
-   try:
-      state:str = df.loc[city_code]["nome_uf"] #acessa o a linha e dps a coluna no dataframe
-      return state
-   except Exception as e:
-        print(f"Erro durante a busca da UF pelo código do município: {e}")
-        return ""
+   meta:dict | None = cache.get_meta(cache_key) if cache is not None else None
+   if meta is not None and cache.is_fresh(meta):
+      return cache.iter_body(cache_key), meta.get("size") #zero chamadas de rede
 
-def __parse_api_results(api_response:list[dict], city_info_df:pd.DataFrame)->list[DataPoint]:
+   headers:dict = __conditional_headers(meta) if meta is not None else {} #revalida a entrada expirada
+   response = __get_session().get(BASE_URL + url_path, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS, stream=True)
+   if response.status_code == 304 and meta is not None:
+      response.close()
+      cache.refresh(cache_key, meta) #servidor confirmou que os dados não mudaram
+      return cache.iter_body(cache_key), meta.get("size")
+   if response.status_code != 200:
+         response.close()
+         raise RuntimeError(f"Falha na request, erro: {response.status_code}")
+
+   content_length:str | None = response.headers.get("Content-Length")
+   chunks:Iterator[bytes] = response.iter_content(STREAM_CHUNK_BYTES)
+   if cache is not None:
+      chunks = cache.tee_body(cache_key, chunks, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+   return chunks, int(content_length) if content_length else None
+
+def __parse_json_batch(text:str)->tuple[list[dict], str]:
    """
-   Faz um parsing no resultado da API do IPEA e retorna uma lista de objetos DataPoint
+   Converte todos os objetos JSON completos no começo de um pedaço de texto da lista da API, e retorna eles junto com
+   o resto do texto (um objeto incompleto que vai ser terminado pelo próximo pedaço).
 
    Args:
-      api_response (list[dict]): resposta da API do IPEA
-      city_info_df (pd.DataFrame): df do pandas com os nomes dos estados associados a cada código do município de um dado
+      text (str): pedaço da lista de objetos da API, sem o "[" inicial
+
+   Return:
+      (tuple[list[dict], str]): objetos completos e o texto que sobrou
+   """
+   end:int = text.rfind("}")
+   if end == -1:
+      return [], text
+   try: #os objetos da API não têm objetos aninhados, então o último "}" fecha um objeto e o pedaço inteiro é convertido de uma vez
+      return json.loads("[" + text[:end + 1].lstrip(" \t\r\n,") + "]"), text[end + 1:]
+   except json.JSONDecodeError: #um "}" dentro de uma string, converte objeto por objeto até onde der
+      decoder = json.JSONDecoder()
+      batch:list[dict] = []
+      pos:int = 0
+      while True:
+         while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+         try:
+            record, pos = decoder.raw_decode(text, pos)
+         except json.JSONDecodeError:
+            return batch, text[pos:]
+         batch.append(record)
+
+def __stream_records_to_columns(chunks:Iterable[bytes], size_hint:int | None = None, years:set[int] | None = None)->dict[str,np.ndarray]:
+   """
+   Converte o corpo de uma resposta da API (lista de objetos JSON) aos poucos, direto para colunas tipadas do NumPy,
+   sem nunca ter a resposta inteira, a lista de dicts ou uma lista de objetos na memória. As colunas são alocadas com
+   uma estimativa do número de registros a partir do tamanho da resposta e crescem (dobrando) se precisarem.
+
+   Se years for passado, o ano de cada pedaço é convertido primeiro e os registros de outros anos são descartados
+   antes de converter as outras colunas, então eles nunca chegam às colunas.
+
+   Args:
+      chunks (Iterable[bytes]): pedaços do corpo da resposta da API
+      size_hint (int | None): tamanho do corpo da resposta em bytes, se for conhecido
+      years (set[int] | None): anos mantidos, None mantém todos
+
+   Return:
+      (dict[str,np.ndarray]): colunas valor (float64), ano (int16) e cod (int32)
+   """
+   import numpy as np
+
+   APPROX_BYTES_PER_RECORD = 70 #um registro da API tem por volta de 70 bytes: {"id":...,"periodo":"YYYY-MM-DD","valor":"...","cod":"..."}
+   expected_records:int = (size_hint or 0) // APPROX_BYTES_PER_RECORD
+   if years is not None: #só a fração dos anos pedidos vai para as colunas
+      num_years_in_series:int = MOST_RECENT_YEAR_IN_SERIES - OLDEST_YEAR_IN_SERIES + 1
+      expected_records = expected_records * min(len(years), num_years_in_series) // num_years_in_series
+      years_array:np.ndarray = np.fromiter(years, dtype=np.int16, count=len(years))
+   capacity:int = max(1024, expected_records)
+   columns:dict[str,np.ndarray] = {
+      "valor": np.empty(capacity, dtype=np.float64),
+      "ano": np.empty(capacity, dtype=np.int16),
+      "cod": np.empty(capacity, dtype=np.int32)
+   }
+   num_rows:int = 0
+   decoder = codecs.getincrementaldecoder("utf-8")() #um caractere pode ficar dividido entre dois pedaços
+   text:str = ""
+   started:bool = False
+
+   for chunk in chunks:
+      text += decoder.decode(chunk)
+      if not started: #pula o "[" que abre a lista
+         text = text.lstrip()
+         if not text:
+            continue
+         if text[0] != "[":
+            raise ValueError("Resposta da API não é uma lista JSON")
+         text = text[1:]
+         started = True
+
+      batch, text = __parse_json_batch(text)
+      if not batch:
+         continue
+      batch_years:np.ndarray = np.array([record["periodo"][:4] for record in batch], dtype=object).astype(np.int16) #YYYY-MM-DD -> YYYY
+      if years is not None:
+         keep:np.ndarray = np.isin(batch_years, years_array)
+         if not keep.all():
+            batch = [batch[i] for i in np.flatnonzero(keep)]
+            batch_years = batch_years[keep]
+      batch_size:int = len(batch)
+      if batch_size == 0:
+         continue
+      if num_rows + batch_size > capacity:
+         capacity = max(capacity * 2, num_rows + batch_size)
+         for name in columns:
+            columns[name] = np.resize(columns[name], capacity)
+
+      end:int = num_rows + batch_size
+      columns["valor"][num_rows:end] = np.array([record["valor"] for record in batch], dtype=object).astype(np.float64)
+      columns["ano"][num_rows:end] = batch_years
+      columns["cod"][num_rows:end] = np.array([record["cod"] for record in batch], dtype=object).astype(np.int32)
+      num_rows = end
+
+   if not started or text.strip(" \t\r\n,") != "]":
+      raise ValueError("Resposta da API terminou no meio da lista JSON")
+   return {name: column[:num_rows] for name, column in columns.items()}
+
+def __series_id_and_name(time_series:TimeSeries | int)->tuple[int,str]:
+   """
+   Retorna o id e o nome de uma série histórica, que pode ser um membro do enum TimeSeries ou um id da API.
+   Para ids da API o nome é o próprio id.
+   """
+   if isinstance(time_series, TimeSeries):
+      return time_series.value["id"], time_series.value["name"]
+   return int(time_series), str(time_series)
 
+def __get_api_response(time_series:TimeSeries | int, abrangencia:int = MUNICIPALITY_SCOPE, cache:ResponseCache | None = API_CACHE)->list[dict]:
+   """
+   Faz uma request à API do IPEA atlas da violência dado um série histórica passada como argumento.
+   As respostas ficam salvas no cache do disco, por id da série e abrangência.
+
+   Args:
+      time_series (TimeSeries | int): Objeto (ou id da série na API) que dita qual dado/série histórica será buscado na API
+      abrangencia (int): abrangência dos dados na API, o padrão (4) é um dado por município
+      cache (ResponseCache | None): cache das respostas, None desativa o cache
+   
    Return:
-      (list[DataPoint]): lista de objetos DataPoint, cada um contendo um dado, de um ano em uma cidade (com o nome do estado tbm)
+      (list[dict]): retorno da API, consiste em uma lista de dicionários, cada dict tem as chaves: (id,periodo,valor,cod)
    """
    
-   parse_dates_to_years = lambda x : x[:x.find("-")] #função que transforma a string YYYY-MM-DD em uma string YYYY
-   dict_to_datapoint =  lambda x: DataPoint( #função transforma um dict que veio da API em um objeto DataPoint
-      valor=float(x["valor"]),
-      ano= int(parse_dates_to_years(x["periodo"])),  
-      cod_munic=int(x["cod"]),
-      uf = __get_state_from_city_code(city_info_df,int(x["cod"]))
+   id, _ = __series_id_and_name(time_series)
+   SERIES_URL = f"api/v1/valores-series/{id}/{abrangencia}" #20 é o id do tema de taxa de homicídios e 4 é a abrangencia dos dados para cada município
+   return __cached_api_get(SERIES_URL, f"valores-series_{id}_{abrangencia}", cache)
+
+def __get_api_columns(
+   time_series:TimeSeries | int,
+   abrangencia:int = MUNICIPALITY_SCOPE,
+   cache:ResponseCache | None = API_CACHE,
+   years:set[int] | None = None
+)->dict[str,np.ndarray]:
+   """
+   Versão em streaming de __get_api_response: a resposta é lida aos poucos (da rede ou do cache) e convertida
+   direto para colunas do NumPy, então o pico de memória fica perto do tamanho das colunas finais.
+
+   Args:
+      time_series (TimeSeries | int): Objeto (ou id da série na API) que dita qual dado/série histórica será buscado na API
+      abrangencia (int): abrangência dos dados na API, o padrão (4) é um dado por município
+      cache (ResponseCache | None): cache das respostas, None desativa o cache
+      years (set[int] | None): anos mantidos nas colunas, os registros dos outros anos são descartados durante o parsing
+
+   Return:
+      (dict[str,np.ndarray]): colunas valor (float64), ano (int16) e cod (int32) da resposta da API
+   """
+   id, _ = __series_id_and_name(time_series)
+   SERIES_URL = f"api/v1/valores-series/{id}/{abrangencia}"
+   chunks, size_hint = __cached_api_stream(SERIES_URL, f"valores-series_{id}_{abrangencia}", cache)
+   return __stream_records_to_columns(chunks, size_hint, years)
+
+class CityIndex():
+   """
+   Índice binário que associa os códigos usados na API (código do município ou da UF) ao estado. Os códigos ficam num
+   array int32 ordenado e o estado de cada código num array uint8 que indexa a lista uf_names, então a busca é uma
+   busca binária vetorizada (np.searchsorted).
+
+   O índice é gerado uma vez a partir do CSV do IBGE e salvo em arquivos .npy, que são abertos com memory map nas
+   próximas execuções. Ele é gerado de novo automaticamente quando o CSV muda (pela data de modificação, tamanho e hash).
+   """
+   __slots__ = ("codes", "uf_codes", "uf_names")
+
+   def __init__(self, codes:np.ndarray, uf_codes:np.ndarray, uf_names:list[str]):
+      self.codes:np.ndarray = codes
+      self.uf_codes:np.ndarray = uf_codes
+      self.uf_names:list[str] = uf_names
+
+   def lookup(self, codes:np.ndarray)->tuple[np.ndarray, np.ndarray]:
+      """
+      Acha o estado de cada código passado.
+
+      Args:
+         codes (np.ndarray): códigos de município (ou de UF)
+
+      Return:
+         (tuple[np.ndarray, np.ndarray]): máscara dos códigos que existem no índice e o código de UF (índice de uf_names)
+         de cada um deles
+      """
+      import numpy as np
+
+      positions:np.ndarray = np.searchsorted(self.codes, codes)
+      positions[positions == len(self.codes)] = 0 #códigos maiores que todos os do índice
+      matched:np.ndarray = self.codes[positions] == codes
+      return matched, self.uf_codes[positions[matched]]
+
+   @classmethod
+   def load(cls, abrangencia:int, csv_path:str = CSV_CITY_INFO_PATH, index_dir:str = CITY_INDEX_DIR)->"CityIndex":
+      """
+      Carrega o índice de uma abrangência do disco (com memory map), gerando ele a partir do CSV se ele não existir ou
+      se o CSV mudou desde que ele foi gerado.
+
+      Args:
+         abrangencia (int): abrangência dos dados da API (3 para estados, 4 para municípios)
+         csv_path (str): caminho do CSV do IBGE
+         index_dir (str): diretório onde o índice é salvo
+
+      Return:
+         (CityIndex): índice da abrangência
+      """
+      import numpy as np
+      import pandas as pd
+
+      if abrangencia == MUNICIPALITY_SCOPE:
+         code_column = "codigo_municipio"
+      elif abrangencia == STATE_SCOPE:
+         code_column = "uf"
+      else:
+         raise ValueError(f"Abrangência {abrangencia} não suportada, só é possível agregar por estado as abrangências {STATE_SCOPE} e {MUNICIPALITY_SCOPE}")
+
+      base_path:str = os.path.join(index_dir, code_column)
+      codes_path, uf_codes_path, meta_path = base_path + "_codes.npy", base_path + "_uf.npy", base_path + ".meta.json"
+      csv_stat = os.stat(csv_path)
+      try:
+         with open(meta_path, "r", encoding="utf-8") as f:
+            meta:dict = json.load(f)
+      except (OSError, ValueError):
+         meta = {}
+
+      is_valid:bool = bool(meta) and meta["csv_size"] == csv_stat.st_size
+      if is_valid and meta["csv_mtime_ns"] != csv_stat.st_mtime_ns: #CSV foi tocado, só é gerado de novo se o conteúdo mudou
+         is_valid = meta["csv_sha256"] == cls.__file_sha256(csv_path)
+         if is_valid:
+            meta["csv_mtime_ns"] = csv_stat.st_mtime_ns
+            cls.__write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+      if is_valid:
+         try:
+            return cls(np.load(codes_path, mmap_mode="r"), np.load(uf_codes_path, mmap_mode="r"), meta["uf_names"])
+         except (OSError, ValueError): #arquivos do índice apagados ou corrompidos, gera de novo
+            pass
+
+      df = pd.read_csv(csv_path, usecols=["nome_uf", code_column]).drop_duplicates(code_column).sort_values(code_column)
+      uf_categorical = pd.Categorical(df["nome_uf"])
+      index = cls(
+         df[code_column].to_numpy(dtype=np.int32),
+         uf_categorical.codes.astype(np.uint8),
+         [str(name) for name in uf_categorical.categories]
+      )
+
+      os.makedirs(index_dir, exist_ok=True)
+      for path, array in ((codes_path, index.codes), (uf_codes_path, index.uf_codes)):
+         with open(path + ".tmp", "wb") as f:
+            np.save(f, array)
+         os.replace(path + ".tmp", path)
+      meta = {
+         "csv_size": csv_stat.st_size,
+         "csv_mtime_ns": csv_stat.st_mtime_ns,
+         "csv_sha256": cls.__file_sha256(csv_path),
+         "uf_names": index.uf_names
+      }
+      cls.__write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+      return index
+
+   @staticmethod
+   def __file_sha256(path:str)->str:
+      with open(path, "rb") as f:
+         return hashlib.sha256(f.read()).hexdigest()
+
+   @staticmethod
+   def __write_atomic(path:str, content:bytes)->None:
+      with open(path + ".tmp", "wb") as f:
+         f.write(content)
+      os.replace(path + ".tmp", path)
+
+__city_indexes:dict[int,CityIndex] = {} #índices já carregados nesse processo, por abrangência
+
+def __load_city_info(abrangencia:int = MUNICIPALITY_SCOPE)->CityIndex:
+   """
+   Retorna o índice código -> estado da abrangência passada, carregando ele na primeira vez que for usado.
+
+   Args:
+      abrangencia (int): abrangência dos dados da API
+
+   Return:
+      (CityIndex): índice do código do município (abrangência 4) ou da UF (abrangência 3) para o estado
+   """
+   if abrangencia not in __city_indexes:
+      __city_indexes[abrangencia] = CityIndex.load(abrangencia)
+   return __city_indexes[abrangencia]
+
+def __parse_api_results(
+   api_response:list[dict] | dict[str,np.ndarray],
+   city_index:CityIndex,
+   years:set[int] | None = None,
+   ufs:list[str] | None = None
+)->DataPointStore:
+   """
+   Faz um parsing no resultado da API do IPEA e retorna um DataPointStore com os dados em colunas.
+   Todo o processamento é vetorizado (colunar): as colunas são criadas direto da lista de dicts da API (ou já vêm
+   prontas do modo streaming), os anos são extraídos com operações de string do pandas e o estado de cada município
+   é achado com uma única busca vetorizada no índice do IBGE, ao invés de uma busca por linha.
+
+   Os filtros de ano e de estado são aplicados aqui, antes do DataPointStore ser criado: os registros de outros anos
+   são descartados antes da busca do estado no índice do IBGE, e os de outros estados logo depois dela.
+
+   Args:
+      api_response (list[dict] | dict[str,np.ndarray]): resposta da API do IPEA, ou as colunas de __get_api_columns
+      city_index (CityIndex): índice com o estado associado a cada código de município
+      years (set[int] | None): anos mantidos, None mantém todos
+      ufs (list[str] | None): nomes dos estados mantidos, None mantém todos
+
+   Return:
+      (DataPointStore): dados de cada ano em cada cidade, com o código do estado
+   """
+   import numpy as np
+   import pandas as pd
+
+   years_array:np.ndarray | None = None if years is None else np.fromiter(years, dtype=np.int16, count=len(years))
+
+   if isinstance(api_response, dict): #colunas vindas do modo streaming
+      columns:dict[str,np.ndarray] = api_response
+      if years_array is not None:
+         keep:np.ndarray = np.isin(columns["ano"], years_array)
+         if not keep.all(): #o modo streaming já descarta os outros anos se recebeu os mesmos anos
+            columns = {name: column[keep] for name, column in columns.items()}
+   else:
+      raw_df = pd.DataFrame.from_records(api_response, columns=["periodo","valor","cod"]) #só as colunas usadas são criadas
+      ano:np.ndarray = raw_df["periodo"].str.slice(0, 4).to_numpy(dtype=np.int16) #YYYY-MM-DD -> YYYY
+      if years_array is not None: #as outras colunas só são convertidas para os anos pedidos
+         keep = np.isin(ano, years_array)
+         raw_df, ano = raw_df[keep], ano[keep]
+      columns = {
+         "valor": raw_df["valor"].to_numpy(dtype=np.float64),
+         "ano": ano,
+         "cod": raw_df["cod"].to_numpy(dtype=np.int32)
+      }
+
+   matched, uf_codes = city_index.lookup(columns["cod"]) #join com o índice do IBGE de uma vez só
+
+   num_unmatched = int(len(matched) - matched.sum())
+   if num_unmatched > 0: #códigos sem estado são descartados e reportados de uma vez
+      num_codes = len(np.unique(columns["cod"][~matched]))
+      print(f"Aviso: {num_unmatched} registros ({num_codes} códigos de município) sem UF correspondente foram descartados")
+
+   if ufs is not None:
+      uf_names:list[str] = list(city_index.uf_names)
+      unknown_ufs:list[str] = [uf for uf in ufs if uf not in uf_names]
+      if unknown_ufs:
+         raise ValueError(f"Estados não encontrados no CSV do IBGE: {', '.join(unknown_ufs)}")
+      in_ufs:np.ndarray = np.isin(uf_codes, [uf_names.index(uf) for uf in ufs])
+      matched[matched] = in_ufs #posições do índice casadas que também estão nos estados pedidos
+      uf_codes = uf_codes[in_ufs]
+
+   return DataPointStore(
+      valor=columns["valor"][matched],
+      ano=columns["ano"][matched],
+      cod_munic=columns["cod"][matched],
+      uf_codes=uf_codes,
+      uf_names=city_index.uf_names
    )
-   return list(map(dict_to_datapoint,api_response)) #aplica a função dict_to_datapoint em cada elemento da lista
+
+def __filter_ufs(grouped_df:pd.DataFrame, ufs:list[str] | None)->pd.DataFrame:
+   """
+   Filtra um DF agrupado por estado e ano (indexado por (uf,ano)) para ter só os estados passados.
+   """
+   if ufs is None:
+      return grouped_df
+   return grouped_df[grouped_df.index.get_level_values("uf").isin(set(ufs))]
 
 def __map_num_to_time_series(time_series_num:int)->TimeSeries | None:
    """
@@ -125,96 +912,258 @@ def __map_num_to_time_series(time_series_num:int)->TimeSeries | None:
       
    return None
 
-def print_available_time_series()->None:
+def print_available_time_series(cache:ResponseCache | None = API_CACHE)->None:
    """
    Printa no terminal todas as séries históricas da API IPEA Atlas da Violência e seus IDs correspondentes.
    Essa lista é apenas para séries no tema geral de Violência, esses temas são ditados pela API e pelo sistema do 
    IPEA
 
    Args:
-      (None)
+      cache (ResponseCache | None): cache das respostas, None desativa o cache
    Return:
       (None)
    """
    
    TIME_SERIES_INFO_URL = "api/v1/series/0" #url para pegar todas as séries no tema de homicídios
-   path = BASE_URL + TIME_SERIES_INFO_URL
-   response = requests.get(path)
-   if response.status_code != 200:
-         raise RuntimeError(f"Falha na request, erro: {response.status_code}")
-   response.encoding = 'utf-8'
-   series_list = response.json()
+   series_list:list[dict] = __cached_api_get(TIME_SERIES_INFO_URL, "series_0", cache)
    
    for series in series_list: #loop por cada série histórica 
       nome_series: str = series["titulo"]
       id: int = series["id"]
       print(f"Nome Série: {nome_series}, Id: {id}") #print nas informações
 
-def plot_graphs_by_year(df:pd.DataFrame, time_series:TimeSeries)->None:
+def __render_year_chart(year:int, values:np.ndarray, states:list[str], series_name:str, output_dir:str = ".")->str:
+   """
+   Desenha e salva o gráfico de barras de um ano. Usa uma Figure do matplotlib direto (backend Agg), sem o estado
+   global do pyplot, então pode rodar em paralelo em processos diferentes. Todas as barras são criadas com uma única
+   chamada ao ax.bar.
+
+   Args:
+      year (int): ano do gráfico
+      values (np.ndarray): valor de cada estado no ano, na mesma ordem de states
+      states (list[str]): nomes dos estados
+      series_name (str): nome da série histórica, usado nos textos e no nome do arquivo
+      output_dir (str): diretório onde o gráfico é salvo
+
+   Return:
+      (str): caminho do arquivo salvo
+   """
+   import numpy as np
+   import matplotlib
+   from matplotlib.figure import Figure
+
+   colors = matplotlib.colormaps['tab20']
+   fig = Figure(figsize=(14, 8))
+   ax = fig.subplots()
+
+   bar_width = 0.35
+   bar_positions = np.arange(len(states))
+   bars = ax.bar(bar_positions, values, width=bar_width, color=[colors(i) for i in range(len(states))])
+
+   ax.set_xlabel('Estado') #cria o gráfico
+   ax.set_ylabel(f'{series_name}')
+   ax.set_title(f'{series_name} por Estado no ano: {year}')
+   ax.set_xticks(bar_positions)
+   ax.set_xticklabels(states, rotation=90)
+   ax.legend(bars.patches, states, title='UF', bbox_to_anchor=(1.05, 1), loc='upper left') #uma entrada na legenda por estado
+
+   #salva o gráfico num arquivo
+   path:str = os.path.join(output_dir, f'{series_name}_estados_grafico_{year}.png')
+   fig.savefig(path, bbox_inches='tight')
+   return path
+
+def plot_graphs_by_year(df:pd.DataFrame, time_series:TimeSeries, max_workers:int | None = None, output_dir:str = ".")->None:
    """
    Dado um df agrupado por ano e estado e o dado/série histórica que será extraido(a), gera gráficos (cada um para um ano) dos dados
-   presentes no df.
+   presentes no df. Os gráficos de cada ano são desenhados em paralelo num pool de processos.
 
    Args:
       df (pd.DataFrame): df do pandas agrupado por ano e estado
       time_series (TimeSeries): objeto que representa a qual série histórica os gráficos pertencem
+      max_workers (int | None): número de processos usados para desenhar os gráficos, o padrão é o número de CPUs.
+      Com 1 os gráficos são desenhados no próprio processo
+      output_dir (str): diretório onde os gráficos são salvos
    
    Return:
       (None): Nenhum retorno
    """
+   from concurrent.futures import ProcessPoolExecutor
+
   
    df_reset = df.reset_index() #reset no index para plotar os gráficos
    df_pivot = df_reset.pivot(index='ano', columns='uf', values='valor')
-   colors = plt.colormaps.get_cmap('tab20')
    series_name:str = time_series.value["name"]
+   states:list[str] = list(df_pivot.columns)
+   jobs:list[tuple] = [(year, df_pivot.loc[year].to_numpy(), states, series_name, output_dir) for year in df_pivot.index] #um gráfico por ano
 
-   for year in df_pivot.index: #loop por todos os anos dos dados
-      fig, ax = plt.subplots(figsize=(14, 8))
+   num_workers:int = min(max_workers or os.cpu_count() or 1, len(jobs))
+   if num_workers <= 1:
+      for job in jobs:
+         __render_year_chart(*job)
+      return
 
-      bar_width = 0.35
-      bar_positions = np.arange(len(df_pivot.columns))
+   with ProcessPoolExecutor(max_workers=num_workers) as executor:
+      for _ in executor.map(__render_year_chart, *zip(*jobs)): #percorre os resultados para propagar erros dos processos
+         pass
 
-      for i, state in enumerate(df_pivot.columns):
-         ax.bar(bar_positions[i], df_pivot.loc[year, state], width=bar_width, label=state, color=colors(i))
-
-      ax.set_xlabel('Estado') #cria o gráfico
-      ax.set_ylabel(f'{series_name}')
-      ax.set_title(f'{series_name} por Estado no ano: {year}')
-      ax.set_xticks(bar_positions)
-      ax.set_xticklabels(df_pivot.columns, rotation=90)
-      ax.legend(title='UF', bbox_to_anchor=(1.05, 1), loc='upper left')
-
-      #salva o gráfico num arquivo
-      plt.savefig(f'{series_name}_estados_grafico_{year}.png', bbox_inches='tight')
-      plt.close()
-
-def get_grouped_dataframe(list_of_years:list[int], time_series:TimeSeries)->pd.DataFrame:
+def get_grouped_dataframe(
+   list_of_years:list[int],
+   time_series:TimeSeries,
+   streaming:bool = True,
+   use_store:bool = True,
+   ufs:list[str] | None = None
+)->pd.DataFrame:
    """
    Dado uma lista de anos e a série histórica a ser analisada, faz a request API e retorna um DF do pandas agrupado (group_by) pelo estado e ano
    e com uma coluna representando a média dos valores para cada combinação de colunas do group_by.
+   Se a série já estiver no AggregateStore, as médias são lidas direto das partições dos anos pedidos, sem chamar a API
+   e sem ler o CSV do IBGE. Senão (ou se o store passou do TTL) os dados são buscados, com revalidação do cache da
+   API, e a série inteira é materializada no store.
+
+   Sem o store, os filtros de ano e de estado são aplicados durante o parsing da resposta da API, então os registros
+   descartados nunca viram colunas nem passam pela busca do estado.
 
    Args:
       list_of_years (list[int]): lista de anos nos dados que serão analizados
       time_series (TimeSeries): objeto time series que dita qual dado/série histórica será analizada
+      streaming (bool): se a resposta da API é convertida aos poucos direto para colunas (menos memória) ou de uma vez só
+      use_store (bool): se as agregações salvas no disco (AGGREGATE_STORE) são usadas e atualizadas
+      ufs (list[str] | None): nomes dos estados analisados (como no CSV do IBGE), None analisa todos
    
    Return:
       (pd.Dataframe): Dataframe do pandas agrupado por estado e ano e com a média dos valores
    """
-   CSV_CITY_INFO_PATH = "info_municipios_ibge.csv" #arquivo csv extraido do IBGE com informações sobre cidades do Brasil
-   
-   df = pd.read_csv(os.path.join(CSV_CITY_INFO_PATH),usecols=["nome_uf","codigo_municipio"]) #le o csv das informações do municípoo
-   df.set_index('codigo_municipio', inplace=True) # código do município vira o index
-   df.index = df.index.astype(int)
+   series_id, _ = __series_id_and_name(time_series)
+   if use_store:
+      stored_df:pd.DataFrame | None = AGGREGATE_STORE.read(series_id, MUNICIPALITY_SCOPE, list_of_years)
+      if stored_df is not None:
+         return __filter_ufs(stored_df, ufs)
 
-   api_response:list[dict] = __get_api_response(time_series) #chama a api
-   data_points:list[DataPoint] = __parse_api_results(api_response,df) #processa o resultado
-   final_df = pd.DataFrame(data_points) #cria um df com a lista de datapoints com a coluna de estado
+   city_index:CityIndex = __load_city_info() #código do município -> estado
+   years:set[int] | None = None if use_store else set(list_of_years) #o store materializa todos os anos da série
+
+   api_response:list[dict] | dict[str,np.ndarray] = __get_api_columns(time_series, years=years) if streaming else __get_api_response(time_series) #chama a api
+   if use_store: #materializa todos os anos da série e lê só os pedidos
+      AGGREGATE_STORE.refresh(series_id, MUNICIPALITY_SCOPE, __parse_api_results(api_response,city_index))
+      return __filter_ufs(AGGREGATE_STORE.read(series_id, MUNICIPALITY_SCOPE, list_of_years), ufs)
+
+   data_points:DataPointStore = __parse_api_results(api_response,city_index,years,ufs) #processa só os anos e estados pedidos em colunas com o código do estado
+   final_df:pd.DataFrame = data_points.to_dataframe() #cria um df com as colunas, sem copiar os dados
    
    final_df =final_df.drop(["cod_munic"],axis="columns") #coluna de codigo do município não é mais necessária
-   final_df = final_df[ final_df["ano"].apply(lambda x: x in list_of_years)] #filtra o df para ter apenas os anos especificados
 
-   group_by_state_and_year = final_df.groupby(["uf","ano"]) #faz um groupby nas colunas de uf (estado) e ano
-   return group_by_state_and_year.mean() #calcula a média da coluna de valores de cada agrupamento
+   group_by_state_and_year = final_df.groupby(["uf","ano"], observed=True) #faz um groupby nas colunas de uf (estado) e ano
+   grouped_df = group_by_state_and_year.mean() #calcula a média da coluna de valores de cada agrupamento
+   grouped_df.index = grouped_df.index.set_levels(grouped_df.index.levels[0].astype(str), level="uf") #nomes dos estados como texto
+   return grouped_df
+
+def get_grouped_dataframe_for_series(
+   list_of_years:list[int],
+   series_list:list[TimeSeries | int],
+   abrangencias:list[int] | None = None,
+   max_workers:int = MAX_CONCURRENT_REQUESTS,
+   streaming:bool = True,
+   use_store:bool = True,
+   ufs:list[str] | None = None
+)->pd.DataFrame:
+   """
+   Versão de get_grouped_dataframe para várias séries históricas e/ou abrangências de uma vez. As requests são feitas
+   de forma concorrente (no máximo max_workers ao mesmo tempo) pela sessão HTTP compartilhada, então o tempo total
+   fica próximo ao da request mais lenta, e não da soma de todas.
+
+   Args:
+      list_of_years (list[int]): lista de anos nos dados que serão analizados
+      series_list (list[TimeSeries | int]): séries históricas analisadas, membros do enum TimeSeries ou ids da API
+      abrangencias (list[int] | None): abrangências buscadas para cada série (3 para estados, 4 para municípios), o padrão é só municípios
+      max_workers (int): número máximo de requests simultâneas
+      streaming (bool): se as respostas da API são convertidas aos poucos direto para colunas (menos memória) ou de uma vez só
+      use_store (bool): se as agregações salvas no disco (AGGREGATE_STORE) são usadas e atualizadas, séries já
+      materializadas não são buscadas na API
+      ufs (list[str] | None): nomes dos estados analisados (como no CSV do IBGE), None analisa todos
+   
+   Return:
+      (pd.DataFrame): DF no formato longo com as colunas (serie_id,serie,abrangencia,uf,ano,valor), com a média dos valores
+      para cada combinação de série, abrangência, estado e ano
+   """
+   import pandas as pd
+   from concurrent.futures import ThreadPoolExecutor
+
+   if abrangencias is None:
+      abrangencias = [MUNICIPALITY_SCOPE]
+
+   requests_to_make:list[tuple[int,int]] = [] #(id da série, abrangência) sem repetições, séries diferentes podem ter o mesmo id
+   for series in series_list:
+      for abrangencia in abrangencias:
+         key = (__series_id_and_name(series)[0], abrangencia)
+         if key not in requests_to_make:
+            requests_to_make.append(key)
+
+   grouped:dict[tuple[int,int],pd.DataFrame] = {} #médias por estado e ano de cada (id da série, abrangência)
+   if use_store:
+      for key in requests_to_make:
+         stored_df:pd.DataFrame | None = AGGREGATE_STORE.read(key[0], key[1], list_of_years)
+         if stored_df is not None:
+            grouped[key] = stored_df
+      requests_to_make = [key for key in requests_to_make if key not in grouped]
+
+   if requests_to_make:
+      city_indexes:dict[int,CityIndex] = {abrangencia: __load_city_info(abrangencia) for abrangencia in {key[1] for key in requests_to_make}}
+      years:set[int] | None = None if use_store else set(list_of_years) #o store materializa todos os anos da série
+      with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(requests_to_make)))) as executor:
+         futures = {
+            key: executor.submit(__get_api_columns, key[0], key[1], API_CACHE, years) if streaming else executor.submit(__get_api_response, key[0], key[1])
+            for key in requests_to_make
+         }
+         responses:dict[tuple[int,int],list[dict] | dict[str,np.ndarray]] = {key: future.result() for key, future in futures.items()}
+
+      for key, api_response in responses.items():
+         if use_store:
+            AGGREGATE_STORE.refresh(key[0], key[1], __parse_api_results(api_response, city_indexes[key[1]]))
+            grouped[key] = AGGREGATE_STORE.read(key[0], key[1], list_of_years)
+            continue
+         data_points:DataPointStore = __parse_api_results(api_response, city_indexes[key[1]], years, ufs)
+         df = data_points.to_dataframe().drop(["cod_munic"],axis="columns")
+         df["uf"] = df["uf"].astype(str)
+         grouped[key] = df.groupby(["uf","ano"])[["valor"]].mean()
+
+   dfs:list[pd.DataFrame] = []
+   for series in series_list:
+      series_id, series_name = __series_id_and_name(series)
+      for abrangencia in abrangencias:
+         df = __filter_ufs(grouped[(series_id, abrangencia)], ufs).reset_index()
+         df.insert(0, "serie_id", series_id) #marca de qual série e abrangência os dados vieram
+         df.insert(1, "serie", series_name)
+         df.insert(2, "abrangencia", abrangencia)
+         dfs.append(df)
+
+   return pd.concat(dfs, ignore_index=True)
+
+def refresh_aggregates(series_list:list[TimeSeries | int], abrangencias:list[int] | None = None)->dict[tuple[int,int],list[int]]:
+   """
+   Atualiza o AGGREGATE_STORE das séries passadas. As respostas do cache são revalidadas com a API (uma resposta 304
+   não baixa os dados de novo) e só os anos cujos dados mudaram são recalculados.
+
+   Args:
+      series_list (list[TimeSeries | int]): séries históricas atualizadas, membros do enum TimeSeries ou ids da API
+      abrangencias (list[int] | None): abrangências atualizadas para cada série, o padrão é só municípios
+
+   Return:
+      (dict[tuple[int,int],list[int]]): anos recalculados de cada (id da série, abrangência)
+   """
+   if abrangencias is None:
+      abrangencias = [MUNICIPALITY_SCOPE]
+   revalidating_cache = ResponseCache(API_CACHE.cache_dir, ttl_seconds=0, max_bytes=API_CACHE.max_bytes) #força a revalidação
+
+   changed_years:dict[tuple[int,int],list[int]] = {}
+   for abrangencia in abrangencias:
+      city_index:CityIndex = __load_city_info(abrangencia)
+      for series in series_list:
+         series_id, _ = __series_id_and_name(series)
+         if (series_id, abrangencia) in changed_years:
+            continue
+         data_points:DataPointStore = __parse_api_results(__get_api_columns(series_id, abrangencia, revalidating_cache), city_index)
+         changed_years[(series_id, abrangencia)] = AGGREGATE_STORE.refresh(series_id, abrangencia, data_points)
+   return changed_years
 
 def get_user_input()->tuple[list[int],TimeSeries]:
    """
@@ -229,8 +1178,6 @@ def get_user_input()->tuple[list[int],TimeSeries]:
    """
    
    print("Olá, este programa utiliza a API do IPEA para buscar dados sobre a série histórica de taxa de homicídios em estados brasileiros \n")
-   OLDEST_YEAR_IN_SERIES: int = 1989 #constantes para os anos de início e fim das séries históricas
-   MOST_RECENT_YEAR_IN_SERIES:int = 2022
    years_list:list[int]
    
    while True:
@@ -275,12 +1222,85 @@ def get_user_input()->tuple[list[int],TimeSeries]:
       except:
          print("falha ao entrar o dado buscado, tente de novo") #continua loop
 
-if __name__ == "__main__":
-   years_list, time_series = get_user_input() #pega input do usuário
-   avg_homicide_rate_per_state_and_years = get_grouped_dataframe(years_list,time_series) #gera dataframe com os dados da API
-   print("Gerando gráficos")
-   plot_graphs_by_year(avg_homicide_rate_per_state_and_years,time_series) #gera os gráficos
+def __parse_years_arg(value:str)->list[int]:
+   """
+   Converte um argumento de ano da linha de comando, um ano (AAAA) ou um intervalo de anos (AAAA-AAAA), numa lista de anos.
+   """
+   try:
+      if "-" in value:
+         start, end = (int(year) for year in value.split("-", 1))
+         years = list(range(start, end + 1))
+      else:
+         years = [int(value)]
+   except ValueError:
+      raise argparse.ArgumentTypeError(f"ano inválido: {value}, use AAAA ou AAAA-AAAA")
+
+   if not years or years[0] < OLDEST_YEAR_IN_SERIES or years[-1] > MOST_RECENT_YEAR_IN_SERIES:
+      raise argparse.ArgumentTypeError(f"anos devem estar entre {OLDEST_YEAR_IN_SERIES} e {MOST_RECENT_YEAR_IN_SERIES}: {value}")
+   return years
+
+def __parse_series_arg(value:str)->TimeSeries:
+   """
+   Converte um argumento de série histórica da linha de comando, o número do menu (1 a 4) ou o nome do membro do enum
+   TimeSeries (ex: homicide_rate), num objeto TimeSeries.
+   """
+   series:TimeSeries | None = __map_num_to_time_series(int(value)) if value.isdigit() else TimeSeries.__members__.get(value.upper())
+   if series is None:
+      raise argparse.ArgumentTypeError(f"série inválida: {value}, use --list-series para ver as opções")
+   return series
+
+def __build_arg_parser()->argparse.ArgumentParser:
+   parser = argparse.ArgumentParser(
+      description="Gera gráficos por estado e ano das séries históricas do IPEA Atlas da Violência. "
+                  "Sem argumentos, os anos e a série são perguntados no terminal."
+   )
+   parser.add_argument("--years", nargs="+", type=__parse_years_arg, metavar="ANO", help="anos analisados, AAAA ou AAAA-AAAA")
+   parser.add_argument("--series", nargs="+", type=__parse_series_arg, metavar="SERIE", help="séries analisadas, pelo número (1 a 4) ou nome (ex: homicide_rate)")
+   parser.add_argument("--out", default=".", help="diretório onde os gráficos são salvos (padrão: diretório atual)")
+   parser.add_argument("--workers", type=int, default=None, help="número de processos usados para desenhar os gráficos (padrão: número de CPUs)")
+   parser.add_argument("--list-series", action="store_true", help="lista as séries disponíveis no programa e sai")
+   parser.add_argument("--list-api-series", action="store_true", help="lista todas as séries de violência da API do IPEA e sai")
+   parser.add_argument("--refresh", action="store_true", help="atualiza as agregações salvas das séries (todas, ou as de --series) e sai")
+   return parser
+
+def main(argv:list[str] | None = None)->None:
+   """
+   Ponto de entrada da linha de comando. Com --years e --series roda sem nenhum input (para scripts e jobs em lote),
+   sem argumentos pergunta os anos e a série no terminal como antes.
+
+   Args:
+      argv (list[str] | None): argumentos da linha de comando, o padrão é sys.argv
+   """
+   parser = __build_arg_parser()
+   args = parser.parse_args(argv)
+
+   if args.list_series:
+      for num, series in enumerate(TimeSeries, start=1):
+         print(f"{num}: {series.name.lower()} - {series.value['name']} (id {series.value['id']})")
+      return
+   if args.list_api_series:
+      print_available_time_series()
+      return
+   if args.refresh:
+      for (series_id, abrangencia), years in refresh_aggregates(args.series or list(TimeSeries)).items():
+         print(f"Série {series_id} (abrangência {abrangencia}): {len(years)} anos recalculados {years}")
+      return
+
+   if args.years is None and args.series is None:
+      years_list, time_series = get_user_input() #pega input do usuário
+      series_list:list[TimeSeries] = [time_series]
+   elif args.years is None or args.series is None:
+      parser.error("--years e --series devem ser usados juntos")
+   else:
+      years_list = sorted({year for years in args.years for year in years})
+      series_list = list(dict.fromkeys(args.series)) #sem repetições, na ordem passada
+
+   os.makedirs(args.out, exist_ok=True)
+   for time_series in series_list:
+      grouped_df = get_grouped_dataframe(years_list,time_series) #gera dataframe com os dados da API
+      print(f"Gerando gráficos: {time_series.value['name']}")
+      plot_graphs_by_year(grouped_df,time_series,max_workers=args.workers,output_dir=args.out) #gera os gráficos
    print("Gráficos gerados com sucesso")
- 
-   #print_available_time_series()  #caso o usuário queira ver todas as śeries históricas disponíveis é só chamar essa função
- 
\ No newline at end of file
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,137 @@
+"""
+Benchmarks dos scripts de notas:
+
+- cálculo das médias e da aprovação aluno por aluno (como em exercicio_arquivos.py e monitoria/atv7.py) contra a
+  versão vetorizada de notas_vetorizadas.py, com 10 mil, 100 mil e 1 milhão de alunos sintéticos. As duas versões
+  começam das linhas do arquivo já lidas e terminam com o texto do resultado pronto;
+- leitura de um arquivo de notas sintético de vários GB com readlines/rstrip/split/int (como o ler_entrada de atv7.py,
+  em lotes de linhas para caber na memória) contra o parser com mmap de notas_vetorizadas.py.
+
+Uso:
+   python3 benchmark_notas.py
+   python3 benchmark_notas.py --gb 2
+"""
+import os, io, sys, mmap, random, shutil, tempfile, time
+import numpy as np
+from notas_vetorizadas import (
+   ResumoVetorizado, blocos_de_linhas, calcula_resultados, converte_bloco, converte_janela, formata_resultados, janelas_mmap
+)
+
+QUANTIDADES_ALUNOS:list[int] = [10_000, 100_000, 1_000_000]
+TAMANHO_LOTE_READLINES:int = 64 * 1024 * 1024
+
+def gera_linhas(num_alunos:int, notas_por_aluno:int = 3)->list[str]:
+   gerador = random.Random(0)
+   return [f"Aluno{i} " + " ".join(str(gerador.randint(0, 10)) for _ in range(notas_por_aluno)) + "\n" for i in range(num_alunos)]
+
+def mediaN(valores:list[int])->float:
+   quantidade = len(valores)
+   soma = 0
+   for i in range(quantidade):
+      soma = soma + valores[i]
+   return soma / quantidade
+
+def resultado_por_aluno(linhas:list[str], media_aprovacao:float)->str:
+   """
+   Versão antiga: converte, calcula a média e classifica um aluno por vez.
+   """
+   partes:list[str] = []
+   for linha in linhas:
+      campos:list[str] = linha.rstrip("\n").split()
+      notas:list[int] = [int(nota) for nota in campos[1:]]
+      media:float = round(mediaN(notas), 1)
+      partes.append(f"O aluno {campos[0]} foi {'Aprovado' if media >= media_aprovacao else 'Reprovado'}\n")
+   return "".join(partes)
+
+def resultado_vetorizado(linhas:list[str], media_aprovacao:float)->str:
+   resumo = ResumoVetorizado()
+   return "".join(
+      formata_resultados(calcula_resultados(converte_bloco(bloco, resumo), media_aprovacao, casas_decimais=1))
+      for bloco in blocos_de_linhas(linhas)
+   )
+
+def melhor_tempo(funcao, *argumentos, repeticoes:int = 3)->tuple[float, str]:
+   tempos:list[float] = []
+   for _ in range(repeticoes):
+      inicio:float = time.perf_counter()
+      resultado = funcao(*argumentos)
+      tempos.append(time.perf_counter() - inicio)
+   return min(tempos), resultado
+
+def gera_arquivo(caminho:str, tamanho_bytes:int)->None:
+   """
+   Escreve um arquivo de notas sintético com pelo menos tamanho_bytes, repetindo um bloco de 1 milhão de alunos.
+   """
+   bloco:bytes = "".join(gera_linhas(1_000_000)).encode()
+   with open(caminho, "wb") as f:
+      for _ in range(-(-tamanho_bytes // len(bloco))):
+         f.write(bloco)
+
+def le_com_split(caminho:str)->tuple[int, float]:
+   """
+   Caminho antigo: uma string por linha, rstrip, split e int por nota. As linhas são lidas em lotes (readlines com
+   limite de tamanho) porque o arquivo inteiro não cabe na memória como listas do Python.
+
+   Return:
+      (tuple[int, float]): quantidade de alunos e soma de todas as notas
+   """
+   num_alunos:int = 0
+   soma:float = 0
+   with open(caminho, "r") as f:
+      while linhas := f.readlines(TAMANHO_LOTE_READLINES):
+         for linha in linhas:
+            campos:list = linha.rstrip("\n").split()
+            for j in range(1, len(campos)):
+               campos[j] = int(campos[j])
+            soma += sum(campos[1:])
+            num_alunos += 1
+   return num_alunos, soma
+
+def le_com_mmap(caminho:str)->tuple[int, float]:
+   """
+   Parser com mmap: as notas são convertidas direto dos bytes mapeados, e os nomes ficam só como posições.
+
+   Return:
+      (tuple[int, float]): quantidade de alunos e soma de todas as notas
+   """
+   num_alunos:int = 0
+   soma:float = 0
+   with open(caminho, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+      for janela in janelas_mmap(dados):
+         notas = converte_janela(janela)
+         if notas is None: #alguma nota não é inteira, a janela é lida como texto, como em processa_arquivo_mmap
+            for linhas in blocos_de_linhas(io.StringIO(janela.tobytes().decode("utf-8"), newline="\n")):
+               bloco = converte_bloco(linhas, ResumoVetorizado())
+               num_alunos += len(bloco.nomes)
+               soma += float(bloco.notas.sum(dtype=np.float64))
+         else:
+            num_alunos += len(notas.somas)
+            soma += float(notas.somas.sum())
+         del notas, janela #libera as views antes de fechar o mmap
+   return num_alunos, soma
+
+def bench_parser_mmap(tamanho_gb:float)->None:
+   diretorio:str = tempfile.mkdtemp()
+   caminho:str = os.path.join(diretorio, "notas.in")
+   try:
+      gera_arquivo(caminho, int(tamanho_gb * 1024 ** 3))
+      tamanho_mb:float = os.path.getsize(caminho) / 1024 ** 2
+      print(f"Leitura de um arquivo de {tamanho_mb:.0f} MB:")
+      for nome, funcao in (("readlines/split", le_com_split), ("mmap", le_com_mmap)):
+         inicio:float = time.perf_counter()
+         num_alunos, soma = funcao(caminho)
+         tempo:float = time.perf_counter() - inicio
+         print(f"   {nome:<16} {tempo:>8.2f}s {tamanho_mb / tempo:>8.1f} MB/s   ({num_alunos} alunos, soma {soma:.0f})")
+   finally:
+      shutil.rmtree(diretorio, ignore_errors=True)
+
+if __name__ == "__main__":
+   print(f"{'alunos':>10} {'por aluno':>12} {'vetorizado':>12} {'ganho':>8}")
+   for num_alunos in QUANTIDADES_ALUNOS:
+      linhas:list[str] = gera_linhas(num_alunos)
+      tempo_loop, texto_loop = melhor_tempo(resultado_por_aluno, linhas, 7)
+      tempo_vetorizado, texto_vetorizado = melhor_tempo(resultado_vetorizado, linhas, 7)
+      assert texto_loop == texto_vetorizado #as duas versões têm que gerar o mesmo resultado
+      print(f"{num_alunos:>10} {tempo_loop:>11.3f}s {tempo_vetorizado:>11.3f}s {tempo_loop / tempo_vetorizado:>7.1f}x")
+   print()
+   bench_parser_mmap(float(sys.argv[sys.argv.index("--gb") + 1]) if "--gb" in sys.argv else 2)
@@ -1,62 +1,215 @@
-import os
+import os, json, hashlib, argparse
+from dataclasses import dataclass, asdict
+from typing import BinaryIO, Iterable, Iterator
+
+TAMANHO_BUFFER_ESCRITA:int = 1024 * 1024 #o resultado é escrito no disco em blocos de 1MB
+BYTES_IMPRESSAO_DIGITAL:int = 4096 #bytes do começo e do fim da parte já processada usados na impressão digital do arquivo
 
 
 #Função para calcular média entre N números
 def mediaN (valores:list[int])->float:
 	return sum(valores)/len(valores)
 
-def ler_entrada(nome_do_arquivo:str)->str:
+@dataclass
+class ResumoProcessamento():
+   """
+   Contagens de um processamento do arquivo de notas, atualizadas conforme as linhas passam pelo pipeline.
+   """
+   aprovados:int = 0
+   reprovados:int = 0
+   linhas_com_erro:int = 0 #linhas em branco ou com notas que não são números
+
+   @property
+   def alunos(self)->int:
+      return self.aprovados + self.reprovados
+
+def ler_entrada(nome_do_arquivo:str)->Iterator[str]:
+   """
+   Lê o arquivo de notas uma linha por vez, sem nunca ter o arquivo inteiro na memória.
+   """
    PATH: str = os.path.join(os.getcwd(), nome_do_arquivo)
-   dados_lidos:str
    with open(PATH,"r") as f:
-      dados_lidos =  f.read()
-   return dados_lidos
+      for linha in f:
+         yield linha
 
 def lista_strings_para_numeros(lista:list[str])->list[int]:
    nova_lista = []
    for num in lista:
        nova_lista.append(int(num))
-   
+
    return nova_lista
-        
-def separa_entrada(conteudos_arquivo:str)->list[dict]:
-   linhas:list[str] = conteudos_arquivo.split("\n")
-   lista_alunos:list[dict] = []
+
+def separa_entrada(linhas:Iterable[str], resumo:ResumoProcessamento)->Iterator[dict]:
+   """
+   Converte cada linha ("nome nota1 nota2 ...") em um dict com o nome e a lista de notas do aluno.
+   Linhas em branco, sem notas ou com notas que não são números inteiros são contadas em resumo.linhas_com_erro e puladas.
+   """
    for linha in linhas:
-       lista_campos:list[str] = linha.split(" ")
-       notas:list[int] = lista_strings_para_numeros(lista_campos[1:])
-       lista_alunos.append(
-           {
-               "nome":lista_campos[0],
-               "notas":notas
-           }
-       )
-   return lista_alunos
+       lista_campos:list[str] = linha.split()
+       if len(lista_campos) < 2: #linha em branco ou aluno sem notas
+           resumo.linhas_com_erro += 1
+           continue
+       try:
+           notas:list[int] = lista_strings_para_numeros(lista_campos[1:])
+       except ValueError:
+           resumo.linhas_com_erro += 1
+           continue
+       yield {
+           "nome":lista_campos[0],
+           "notas":notas
+       }
 
 #Função que verifica os alunos aprovados
-def verifica_aprovados(notas:str)->str:
-   lista_alunos:list[dict] = separa_entrada(notas)
-
+def verifica_aprovados(linhas:Iterable[str], resumo:ResumoProcessamento)->Iterator[str]:
+   """
+   Gera a linha do resultado de cada aluno, conforme as linhas do arquivo de notas são lidas, e conta os aprovados
+   e reprovados em resumo.
+   """
    RESULTADO_ALUNO_TEMPLATE = "O aluno {aluno} foi {resultado}\n"
-   string_resultado:str = ""
    MEDIA_APROVACAO = 5
-   for aluno in lista_alunos:
-      print(aluno)
+   for aluno in separa_entrada(linhas, resumo):
       media:float = mediaN(aluno["notas"])
       resultado:str
       if media < MEDIA_APROVACAO:
          resultado = "Reprovado"
+         resumo.reprovados += 1
       else:
          resultado = "Aprovado"
-      string_resultado += RESULTADO_ALUNO_TEMPLATE.format(aluno= aluno["nome"], resultado = resultado)
-   return string_resultado
+         resumo.aprovados += 1
+      yield RESULTADO_ALUNO_TEMPLATE.format(aluno= aluno["nome"], resultado = resultado)
+
+def exporta_resultado(resultados:Iterable[str], nome_do_arquivo:str = "resultado.txt")->None:
+   """
+   Escreve as linhas do resultado conforme elas são geradas, com um buffer de escrita grande para fazer poucas
+   chamadas de escrita no disco.
+   """
+   PATH: str = os.path.join(os.getcwd(),nome_do_arquivo)
+   with open(PATH,"w",buffering=TAMANHO_BUFFER_ESCRITA) as f:
+       f.writelines(resultados)
+
+def processa_turma(arquivo_notas:str, arquivo_resultado:str)->dict:
+   """
+   Processa o arquivo de notas de uma turma inteira (leitura, verificação e exportação), usado pelo modo em lote.
+
+   Return:
+      (dict): quantidade de aprovados, reprovados e linhas com erro da turma
+   """
+   resumo = ResumoProcessamento()
+   exporta_resultado(verifica_aprovados(ler_entrada(arquivo_notas), resumo), arquivo_resultado)
+   return {"aprovados": resumo.aprovados, "reprovados": resumo.reprovados, "linhas_com_erro": resumo.linhas_com_erro}
+
+def __impressao_digital(f:BinaryIO, posicao:int)->dict:
+   """
+   Impressão digital da parte do arquivo de notas que já foi processada (até posicao): o inode e o hash dos primeiros e
+   dos últimos bytes dessa parte. Ela só lê alguns KB, não importa o tamanho do arquivo.
+   """
+   inicio:int = max(0, posicao - BYTES_IMPRESSAO_DIGITAL)
+   f.seek(0)
+   bytes_inicio:bytes = f.read(min(posicao, BYTES_IMPRESSAO_DIGITAL))
+   f.seek(inicio)
+   bytes_fim:bytes = f.read(posicao - inicio)
+   return {
+      "inode": os.fstat(f.fileno()).st_ino,
+      "inicio": hashlib.sha256(bytes_inicio).hexdigest(),
+      "fim": hashlib.sha256(bytes_fim).hexdigest()
+   }
+
+def __le_checkpoint(caminho:str)->dict | None:
+   try:
+      with open(caminho, "r", encoding="utf-8") as f:
+         return json.load(f)
+   except (OSError, ValueError):
+      return None
 
-def exporta_resultado(notas:str)->None:
-   PATH: str = os.path.join(os.getcwd(),"resultado.txt")
-   with open(PATH,"w") as f:
-       f.write(notas)
+def __salva_checkpoint(caminho:str, checkpoint:dict)->None:
+   with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+      json.dump(checkpoint, f)
+   os.replace(caminho + ".tmp", caminho)
+
+def processa_incremental(arquivo_notas:str = "notas.in", arquivo_resultado:str = "resultado.txt", reconstruir:bool = False)->ResumoProcessamento:
+   """
+   Processa só as linhas adicionadas ao final do arquivo de notas desde a última execução, adicionando os resultados
+   delas ao final do arquivo de resultado. O tempo de cada execução é proporcional às linhas novas.
+
+   Depois de cada execução é salvo um checkpoint (arquivo_resultado + ".checkpoint") com a posição em bytes até onde o
+   arquivo de notas foi processado, o tamanho do arquivo de resultado nesse ponto, as contagens acumuladas e uma
+   impressão digital do arquivo de notas. Se a impressão digital não bater (o arquivo foi reescrito, e não só
+   aumentado) ou o resultado foi alterado, o processamento é refeito do começo.
+
+   Uma última linha sem "\\n" (ainda sendo escrita) é processada, mas fica fora do checkpoint: ela é processada de novo
+   na próxima execução, junto com o que for adicionado a ela.
+
+   Args:
+      arquivo_notas (str): arquivo de notas, que só recebe linhas novas no final
+      arquivo_resultado (str): arquivo de resultado, que recebe os resultados das linhas novas no final
+      reconstruir (bool): ignora o checkpoint e refaz o processamento do começo
+
+   Return:
+      (ResumoProcessamento): contagens de todas as linhas do arquivo de notas, não só das novas
+   """
+   PATH_NOTAS:str = os.path.join(os.getcwd(), arquivo_notas)
+   PATH_RESULTADO:str = os.path.join(os.getcwd(), arquivo_resultado)
+   PATH_CHECKPOINT:str = PATH_RESULTADO + ".checkpoint"
+
+   with open(PATH_NOTAS, "rb") as entrada:
+      checkpoint:dict | None = None if reconstruir else __le_checkpoint(PATH_CHECKPOINT)
+      if checkpoint is not None:
+         tamanho_notas:int = os.fstat(entrada.fileno()).st_size
+         tamanho_resultado:int = os.path.getsize(PATH_RESULTADO) if os.path.exists(PATH_RESULTADO) else -1
+         if (
+            checkpoint.get("arquivo_notas") != PATH_NOTAS
+            or tamanho_notas < checkpoint["posicao"]
+            or tamanho_resultado < checkpoint["tamanho_resultado"]
+            or __impressao_digital(entrada, checkpoint["posicao"]) != checkpoint["impressao_digital"]
+         ):
+            checkpoint = None #arquivo reescrito ou resultado alterado, refaz tudo
+      if checkpoint is None:
+         checkpoint = {"posicao": 0, "tamanho_resultado": 0, "resumo": asdict(ResumoProcessamento())}
+
+      resumo = ResumoProcessamento(**checkpoint["resumo"])
+      posicao:int = checkpoint["posicao"]
+      linha_incompleta:list[bytes] = []
+
+      def linhas_novas()->Iterator[str]:
+         nonlocal posicao
+         for linha in entrada:
+            if not linha.endswith(b"\n"):
+               linha_incompleta.append(linha)
+               return
+            posicao += len(linha)
+            yield linha.decode("utf-8")
+
+      if not os.path.exists(PATH_RESULTADO):
+         open(PATH_RESULTADO, "w").close()
+      os.truncate(PATH_RESULTADO, checkpoint["tamanho_resultado"]) #descarta resultados que ficaram fora do último checkpoint
+      with open(PATH_RESULTADO, "a", buffering=TAMANHO_BUFFER_ESCRITA) as saida:
+         entrada.seek(posicao)
+         saida.writelines(verifica_aprovados(linhas_novas(), resumo))
+         saida.flush()
+         os.fsync(saida.fileno()) #o resultado tem que estar no disco antes do checkpoint que aponta para ele
+         novo_checkpoint:dict = {
+            "arquivo_notas": PATH_NOTAS,
+            "posicao": posicao,
+            "tamanho_resultado": os.fstat(saida.fileno()).st_size,
+            "resumo": asdict(resumo),
+            "impressao_digital": __impressao_digital(entrada, posicao)
+         }
+         saida.writelines(verifica_aprovados([linha.decode("utf-8") for linha in linha_incompleta], resumo))
+
+   __salva_checkpoint(PATH_CHECKPOINT, novo_checkpoint)
+   return resumo
 
 #O programa começa aqui
-notas = ler_entrada("notas.in") #Lê a entrada
-notas = verifica_aprovados(notas) #Realiza a verificação
-exporta_resultado(notas) #Exporta o resultado em um arquivo
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Verifica os alunos aprovados do notas.in e escreve o resultado.txt.")
+   parser.add_argument("--incremental", action="store_true", help="processa só as linhas adicionadas desde a última execução com --incremental")
+   argumentos = parser.parse_args()
+
+   if argumentos.incremental:
+      resumo = processa_incremental()
+   else:
+      resumo = ResumoProcessamento()
+      notas = ler_entrada("notas.in") #Lê a entrada, uma linha por vez
+      resultados = verifica_aprovados(notas, resumo) #Realiza a verificação conforme as linhas são lidas
+      exporta_resultado(resultados) #Exporta o resultado em um arquivo, conforme ele é gerado
+   print(f"{resumo.alunos} alunos processados ({resumo.aprovados} aprovados, {resumo.reprovados} reprovados), {resumo.linhas_com_erro} linhas com erro")
@@ -0,0 +1,236 @@
+"""
+Modo em lote dos scripts de notas: processa os arquivos de notas de várias turmas em paralelo, com um pool de
+processos, usando as funções de exercicio_arquivos.py (média 5) ou de monitoria/atv7.py (média 7).
+
+Os arquivos são divididos em grupos (um grupo por tarefa do pool, para não pagar a comunicação entre processos a cada
+arquivo). Cada turma gera um arquivo de resultado no diretório de saída e, ao final, um resumo geral com os totais de
+todas as turmas é salvo em resumo_geral.json. O nome do resultado leva um hash curto do caminho do arquivo de notas,
+então turmas com o mesmo nome em diretórios diferentes (a/notas.in e b/notas.in) não sobrescrevem uma à outra.
+
+Um arquivo de notas com erro (uma linha que o script não consegue processar, por exemplo) não interrompe o lote: o
+erro vai para o resumo geral, em "erros", e a turma fica fora do registro, para ser tentada de novo na próxima execução.
+
+As turmas terminadas são registradas no concluidos.jsonl do diretório de saída assim que cada grupo termina. Se a
+execução for interrompida e rodada de novo, os arquivos que já estão no registro (e não mudaram desde então) não são
+processados de novo.
+
+Uso:
+   python3 lote_notas.py turmas/ --saida resultados/
+   python3 lote_notas.py "turmas/*.in" --saida resultados/ --script atv7 --workers 4
+"""
+import os, json, glob, hashlib, argparse, tempfile, importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import ModuleType
+
+DIRETORIO_SCRIPTS:str = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS:dict[str,str] = {
+   "exercicio_arquivos": os.path.join(DIRETORIO_SCRIPTS, "exercicio_arquivos.py"),
+   "atv7": os.path.join(DIRETORIO_SCRIPTS, "..", "monitoria", "atv7.py")
+}
+ARQUIVOS_POR_TAREFA:int = 16
+NOME_REGISTRO:str = "concluidos.jsonl"
+NOME_RESUMO:str = "resumo_geral.json"
+
+__modulos:dict[str,ModuleType] = {} #módulos dos scripts já carregados em cada processo
+
+def __carrega_script(script:str)->ModuleType:
+   """
+   Importa um dos scripts de notas pelo caminho do arquivo (os dois estão em diretórios diferentes e não são pacotes).
+   """
+   if script not in __modulos:
+      spec = importlib.util.spec_from_file_location(script, SCRIPTS[script])
+      modulo = importlib.util.module_from_spec(spec)
+      spec.loader.exec_module(modulo)
+      __modulos[script] = modulo
+   return __modulos[script]
+
+def __identidade_arquivo(caminho:str)->dict:
+   """
+   Tamanho e data de modificação do arquivo, usados para saber se ele mudou desde que foi processado.
+   """
+   status = os.stat(caminho)
+   return {"tamanho": status.st_size, "modificado_ns": status.st_mtime_ns}
+
+def __ja_concluido(registro:dict | None, arquivo_notas:str, script:str)->bool:
+   """
+   Se a turma já foi processada com o mesmo script e o arquivo de notas não mudou desde então.
+   """
+   if registro is None or registro.get("script") != script:
+      return False
+   identidade:dict = __identidade_arquivo(arquivo_notas)
+   return registro["tamanho"] == identidade["tamanho"] and registro["modificado_ns"] == identidade["modificado_ns"]
+
+def caminho_resultado(arquivo_notas:str, diretorio_saida:str)->str:
+   nome:str = os.path.splitext(os.path.basename(arquivo_notas))[0]
+   hash_caminho:str = hashlib.sha1(os.path.abspath(arquivo_notas).encode()).hexdigest()[:8]
+   return os.path.join(diretorio_saida, f"{nome}.{hash_caminho}.resultado.txt")
+
+def __processa_turma(modulo:ModuleType, arquivo_notas:str, saida:str, diretorio_saida:str)->dict:
+   """
+   Processa uma turma num arquivo temporário único (dois processos nunca escrevem no mesmo) e renomeia para o nome
+   final, então um arquivo de resultado nunca fica pela metade.
+   """
+   with tempfile.NamedTemporaryFile(dir=diretorio_saida, suffix=".tmp", delete=False) as temporario:
+      pass
+   try:
+      resumo:dict = modulo.processa_turma(arquivo_notas, temporario.name)
+      os.replace(temporario.name, saida)
+   except BaseException:
+      os.remove(temporario.name)
+      raise
+   return resumo
+
+def processa_grupo(script:str, arquivos_notas:list[str], diretorio_saida:str)->list[dict]:
+   """
+   Processa um grupo de turmas dentro de um processo do pool. Um erro numa turma é registrado nela e o grupo continua.
+
+   Args:
+      script (str): qual script de notas é usado ("exercicio_arquivos" ou "atv7")
+      arquivos_notas (list[str]): arquivos de notas das turmas do grupo
+      diretorio_saida (str): diretório dos arquivos de resultado
+
+   Return:
+      (list[dict]): registro de cada turma, com o arquivo de entrada, o de resultado e o resumo da turma, ou com "erro"
+      (a mensagem do erro) se a turma não pôde ser processada
+   """
+   modulo:ModuleType = __carrega_script(script)
+   registros:list[dict] = []
+   for arquivo_notas in arquivos_notas:
+      saida:str = caminho_resultado(arquivo_notas, diretorio_saida)
+      try:
+         identidade:dict = __identidade_arquivo(arquivo_notas) #antes de ler, uma mudança durante a leitura faz a turma ser refeita
+         resumo:dict = __processa_turma(modulo, arquivo_notas, saida, diretorio_saida)
+      except Exception as erro:
+         registros.append({"entrada": arquivo_notas, "script": script, "erro": f"{type(erro).__name__}: {erro}"})
+         continue
+      registros.append({"entrada": arquivo_notas, "script": script, **identidade, "saida": saida, "resumo": resumo})
+   return registros
+
+def le_registro(diretorio_saida:str)->dict[str,dict]:
+   """
+   Lê as turmas já concluídas do registro do diretório de saída. Uma última linha incompleta (execução interrompida no
+   meio da escrita) é ignorada.
+
+   Return:
+      (dict[str,dict]): registro de cada turma concluída, pelo caminho do arquivo de notas
+   """
+   concluidos:dict[str,dict] = {}
+   try:
+      with open(os.path.join(diretorio_saida, NOME_REGISTRO), "r", encoding="utf-8") as f:
+         for linha in f:
+            try:
+               registro:dict = json.loads(linha)
+            except json.JSONDecodeError:
+               continue
+            concluidos[registro["entrada"]] = registro
+   except FileNotFoundError:
+      pass
+   return concluidos
+
+def junta_resumos(resumos:list[dict])->dict:
+   """
+   Soma os resumos de várias turmas: contagens (inteiros) e contagens por faixa (dicionários) são somadas e a média
+   geral (atv7) é a média ponderada pelo número de alunos de cada turma.
+   """
+   total:dict = {}
+   soma_medias:float = 0.0
+   alunos_com_media:int = 0
+   for resumo in resumos:
+      for chave, valor in resumo.items():
+         if isinstance(valor, dict):
+            faixas:dict = total.setdefault(chave, {})
+            for faixa, quantidade in valor.items():
+               faixas[faixa] = faixas.get(faixa, 0) + quantidade
+         elif isinstance(valor, int):
+            total[chave] = total.get(chave, 0) + valor
+      if "media_geral" in resumo:
+         alunos_com_media += resumo["aprovados"] + resumo["reprovados"]
+         soma_medias += resumo["media_geral"] * (resumo["aprovados"] + resumo["reprovados"])
+   if alunos_com_media > 0:
+      total["media_geral"] = round(soma_medias / alunos_com_media, 2)
+   return total
+
+def lista_arquivos(entradas:list[str])->list[str]:
+   """
+   Arquivos de notas a partir de diretórios (todos os .in dentro deles) e/ou padrões glob, sem repetições.
+   """
+   arquivos:list[str] = []
+   for entrada in entradas:
+      if os.path.isdir(entrada):
+         encontrados:list[str] = glob.glob(os.path.join(entrada, "*.in"))
+      else:
+         encontrados = glob.glob(entrada)
+      arquivos.extend(os.path.abspath(arquivo) for arquivo in encontrados if os.path.isfile(arquivo))
+   return sorted(set(arquivos))
+
+def processa_lote(
+   entradas:list[str],
+   diretorio_saida:str,
+   script:str = "exercicio_arquivos",
+   max_workers:int | None = None,
+   arquivos_por_tarefa:int = ARQUIVOS_POR_TAREFA
+)->dict:
+   """
+   Processa as turmas que ainda não foram concluídas em paralelo e salva o resumo geral de todas as turmas.
+
+   Args:
+      entradas (list[str]): diretórios e/ou padrões glob dos arquivos de notas
+      diretorio_saida (str): diretório dos resultados, do registro de turmas concluídas e do resumo geral
+      script (str): qual script de notas é usado ("exercicio_arquivos" ou "atv7")
+      max_workers (int | None): número de processos, None usa um por núcleo
+      arquivos_por_tarefa (int): quantidade de arquivos de cada tarefa do pool
+
+   Return:
+      (dict): resumo geral, com os totais e o número de turmas processadas nesta execução e já concluídas antes, e o
+         erro de cada turma que não pôde ser processada
+   """
+   os.makedirs(diretorio_saida, exist_ok=True)
+   arquivos:list[str] = lista_arquivos(entradas)
+   concluidos:dict[str,dict] = le_registro(diretorio_saida)
+   pendentes:list[str] = [arquivo for arquivo in arquivos if not __ja_concluido(concluidos.get(arquivo), arquivo, script)]
+
+   erros:dict[str,str] = {}
+   grupos:list[list[str]] = [pendentes[i:i + arquivos_por_tarefa] for i in range(0, len(pendentes), arquivos_por_tarefa)]
+   if grupos:
+      with ProcessPoolExecutor(max_workers=max_workers) as executor, open(os.path.join(diretorio_saida, NOME_REGISTRO), "a", encoding="utf-8") as registro:
+         tarefas = {executor.submit(processa_grupo, script, grupo, diretorio_saida): grupo for grupo in grupos}
+         for tarefa in as_completed(tarefas):
+            try:
+               turmas:list[dict] = tarefa.result()
+            except Exception as erro: #o processo do grupo morreu (BrokenProcessPool, por exemplo)
+               turmas = [{"entrada": arquivo, "erro": f"{type(erro).__name__}: {erro}"} for arquivo in tarefas[tarefa]]
+            for turma in turmas:
+               if "erro" in turma:
+                  erros[turma["entrada"]] = turma["erro"]
+                  continue
+               registro.write(json.dumps(turma) + "\n")
+               concluidos[turma["entrada"]] = turma
+            registro.flush() #o grupo só conta como concluído depois de estar no disco
+            os.fsync(registro.fileno())
+
+   processados:list[str] = [arquivo for arquivo in arquivos if arquivo not in erros]
+   resumo_geral:dict = {
+      "turmas": len(arquivos),
+      "turmas_processadas_agora": len(pendentes) - len(erros),
+      "total": junta_resumos([concluidos[arquivo]["resumo"] for arquivo in processados]),
+      "por_turma": {arquivo: concluidos[arquivo]["resumo"] for arquivo in processados},
+      "erros": erros
+   }
+   with open(os.path.join(diretorio_saida, NOME_RESUMO), "w", encoding="utf-8") as f:
+      json.dump(resumo_geral, f, ensure_ascii=False, indent=2)
+   return resumo_geral
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Processa os arquivos de notas de várias turmas em paralelo.")
+   parser.add_argument("entradas", nargs="+", help="diretórios (todos os .in) e/ou padrões glob dos arquivos de notas")
+   parser.add_argument("--saida", required=True, help="diretório dos resultados de cada turma e do resumo geral")
+   parser.add_argument("--script", choices=sorted(SCRIPTS), default="exercicio_arquivos", help="regras de aprovação usadas (média 5 ou média 7)")
+   parser.add_argument("--workers", type=int, default=None, help="número de processos (padrão: um por núcleo)")
+   argumentos = parser.parse_args()
+
+   resumo = processa_lote(argumentos.entradas, argumentos.saida, argumentos.script, argumentos.workers)
+   total:dict = resumo["total"]
+   print(f"{resumo['turmas']} turmas ({resumo['turmas_processadas_agora']} processadas agora): {total.get('aprovados', 0)} aprovados, {total.get('reprovados', 0)} reprovados")
+   for arquivo, erro in resumo["erros"].items():
+      print(f"Erro em {arquivo}: {erro}")
+   print(f"Resumo geral salvo em {os.path.join(argumentos.saida, NOME_RESUMO)}")
@@ -0,0 +1,387 @@
+"""
+Versão vetorizada (NumPy) do cálculo das médias e da aprovação dos alunos, para arquivos de notas muito grandes.
+
+As linhas do arquivo são lidas em blocos. As notas de cada bloco viram uma matriz float32 (uma linha por aluno), e os
+alunos com menos notas ficam com zeros no final da linha, junto com a quantidade de notas de cada aluno. As médias, o
+arredondamento e a aprovação de todos os alunos do bloco são calculados de uma vez, sem um laço por aluno, e o texto do
+resultado é escrito a partir desses arrays.
+
+Uso:
+   python3 notas_vetorizadas.py notas.in resultado.txt 5
+   python3 notas_vetorizadas.py notas.in resultado.txt --script atv7   #média 7, arredondada para uma casa decimal
+"""
+import os, io, mmap, argparse
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator
+import numpy as np
+
+ALUNOS_POR_BLOCO:int = 100_000 #quantidade de linhas convertidas de uma vez, limita a memória usada
+TAMANHO_BUFFER_ESCRITA:int = 1024 * 1024
+SITUACOES:np.ndarray = np.array([" foi Reprovado\n", " foi Aprovado\n"], dtype=object) #indexado pela máscara de aprovação
+TAMANHO_JANELA_MMAP:int = 32 * 1024 * 1024 #bytes do arquivo mapeado processados de uma vez
+MAX_DIGITOS_NOTA:int = 9 #notas com mais dígitos não cabem em int32 e são tratadas como erro
+REGRAS_SCRIPTS:dict[str, tuple[float, int | None]] = { #média de aprovação e casas decimais do arredondamento de cada script
+   "exercicio_arquivos": (5, None),
+   "atv7": (7, 1)
+}
+
+@dataclass
+class NotasBloco():
+   """
+   Notas de um bloco de alunos no formato de matriz.
+   """
+   nomes:list[str]
+   notas:np.ndarray #float32, formato (alunos, maior quantidade de notas), completada com zeros
+   quantidades:np.ndarray #quantidade de notas de cada aluno
+
+@dataclass
+class ResultadoBloco():
+   """
+   Média e situação de cada aluno de um bloco, calculadas de uma vez.
+   """
+   nomes:list[str]
+   medias:np.ndarray
+   aprovados:np.ndarray #máscara dos alunos aprovados
+
+@dataclass
+class ResumoVetorizado():
+   """
+   Contagens de um processamento do arquivo de notas.
+   """
+   aprovados:int = 0
+   reprovados:int = 0
+   linhas_com_erro:int = 0 #linhas em branco ou com notas que não são números inteiros
+
+def __linha_valida(campos:list[str])->bool:
+   if len(campos) < 2:
+      return False
+   try:
+      for nota in campos[1:]:
+         int(nota) #mesma conversão de exercicio_arquivos.py e atv7.py: 7.5, 1e1, nan e inf são erros
+   except ValueError:
+      return False
+   return True
+
+def __monta_matriz(nomes:list[str], valores:np.ndarray, quantidades:np.ndarray)->NotasBloco:
+   """
+   Coloca as notas de todos os alunos (em sequência em valores) na matriz, pelos índices de linha e coluna de cada uma.
+   """
+   num_alunos:int = len(quantidades)
+   max_notas:int = int(quantidades.max()) if num_alunos > 0 else 0
+   notas:np.ndarray = np.zeros((num_alunos, max_notas), dtype=np.float32)
+   if num_alunos > 0:
+      inicio_linhas:np.ndarray = np.cumsum(quantidades) - quantidades #posição da primeira nota de cada aluno em valores
+      linhas_notas:np.ndarray = np.repeat(np.arange(num_alunos), quantidades)
+      colunas_notas:np.ndarray = np.arange(len(valores)) - np.repeat(inicio_linhas, quantidades)
+      notas[linhas_notas, colunas_notas] = valores
+   return NotasBloco(nomes, notas, quantidades)
+
+def __converte_bloco_por_linha(linhas:list[str], resumo:ResumoVetorizado)->NotasBloco:
+   """
+   Caminho lento de converte_bloco, que separa e valida uma linha por vez. Só é usado nos blocos com alguma nota que não
+   é formada só por dígitos ASCII ou com espaços que não são ASCII.
+   """
+   campos_linhas:list[list[str]] = [linha.split() for linha in linhas]
+   campos_linhas_validas:list[list[str]] = [campos for campos in campos_linhas if __linha_valida(campos)]
+   resumo.linhas_com_erro += len(campos_linhas) - len(campos_linhas_validas)
+
+   valores:np.ndarray = np.array([int(nota) for campos in campos_linhas_validas for nota in campos[1:]], dtype=np.float32)
+   quantidades:np.ndarray = np.array([len(campos) - 1 for campos in campos_linhas_validas], dtype=np.int32)
+   return __monta_matriz([campos[0] for campos in campos_linhas_validas], valores, quantidades)
+
+def converte_bloco(linhas:list[str], resumo:ResumoVetorizado)->NotasBloco:
+   """
+   Converte um bloco de linhas ("nome nota1 nota2 ...") em uma matriz de notas, sem um laço por linha: o texto do bloco
+   inteiro é separado em palavras de uma vez, a linha de cada palavra é achada nos bytes do texto com o NumPy (pelos
+   "\\n" antes dela) e todas as notas são convertidas para float32 em uma chamada só. Como em exercicio_arquivos.py, as
+   notas têm que ser números inteiros: linhas em branco, sem notas ou com notas que não são inteiras (7.5, 1e1, nan)
+   são contadas em resumo.linhas_com_erro e descartadas.
+
+   Args:
+      linhas (list[str]): linhas do arquivo de notas
+      resumo (ResumoVetorizado): contagens do processamento, atualizadas com as linhas com erro
+
+   Return:
+      (NotasBloco): nomes, matriz de notas e quantidade de notas de cada aluno
+   """
+   texto:str = "".join(linhas)
+   palavras:list[str] = texto.split()
+   bytes_texto:np.ndarray = np.frombuffer(texto.encode("utf-8"), dtype=np.uint8)
+
+   quebras:np.ndarray = bytes_texto == ord("\n")
+   espacos:np.ndarray = (bytes_texto == ord(" ")) | ((bytes_texto >= 9) & (bytes_texto <= 13)) | ((bytes_texto >= 28) & (bytes_texto <= 31)) #espaços ASCII do str.split
+   inicio_palavras:np.ndarray = ~espacos
+   inicio_palavras[1:] &= espacos[:-1]
+   linha_palavras:np.ndarray = np.cumsum(quebras, dtype=np.int32)[inicio_palavras] #linha de cada palavra
+   if len(linha_palavras) != len(palavras): #algum espaço que não é ASCII separou palavras no str.split
+      return __converte_bloco_por_linha(linhas, resumo)
+
+   palavras_por_linha:np.ndarray = np.bincount(linha_palavras, minlength=len(linhas))
+   linhas_validas:np.ndarray = palavras_por_linha >= 2 #nome e pelo menos uma nota
+   eh_nome:np.ndarray = np.ones(len(linha_palavras), dtype=bool) #primeira palavra de cada linha
+   eh_nome[1:] = linha_palavras[1:] != linha_palavras[:-1]
+   palavra_valida:np.ndarray = linhas_validas[linha_palavras]
+
+   notas:list[str] = [palavras[i] for i in np.flatnonzero(~eh_nome & palavra_valida).tolist()]
+   digitos:str = "".join(notas)
+   if not (digitos.isascii() and digitos.isdecimal()) and len(notas) > 0: #alguma nota com sinal, decimal ou que não é um número
+      return __converte_bloco_por_linha(linhas, resumo)
+   valores:np.ndarray = np.array(notas, dtype=np.float32)
+
+   resumo.linhas_com_erro += int(len(linhas_validas) - linhas_validas.sum())
+   nomes:list[str] = [palavras[i] for i in np.flatnonzero(eh_nome & palavra_valida).tolist()]
+   return __monta_matriz(nomes, valores, (palavras_por_linha[linhas_validas] - 1).astype(np.int32))
+
+def calcula_resultados(bloco:NotasBloco, media_aprovacao:float = 5, casas_decimais:int | None = None)->ResultadoBloco:
+   """
+   Calcula a média, o arredondamento e a aprovação de todos os alunos de um bloco de uma vez.
+
+   Args:
+      bloco (NotasBloco): notas do bloco de alunos
+      media_aprovacao (float): média mínima para aprovação (5 em exercicio_arquivos.py, 7 em monitoria/atv7.py)
+      casas_decimais (int | None): casas decimais do arredondamento da média antes da comparação, None não arredonda
+
+   Return:
+      (ResultadoBloco): média e máscara de aprovação de cada aluno
+   """
+   medias:np.ndarray = __medias(bloco.notas.sum(axis=1, dtype=np.float64), bloco.quantidades, casas_decimais) #os zeros do final não mudam a soma
+   return ResultadoBloco(bloco.nomes, medias, medias >= media_aprovacao)
+
+def __medias(somas:np.ndarray, quantidades:np.ndarray, casas_decimais:int | None)->np.ndarray:
+   medias:np.ndarray = somas / quantidades
+   if casas_decimais is not None:
+      medias = np.round(medias, casas_decimais)
+   return medias
+
+def formata_resultados(resultado:ResultadoBloco)->str:
+   """
+   Texto do resultado de um bloco, uma linha "O aluno {nome} foi {situação}" por aluno.
+   """
+   num_alunos:int = len(resultado.nomes)
+   partes:list[str] = ["O aluno "] * (3 * num_alunos) #"O aluno ", nome e situação de cada aluno, em sequência
+   partes[1::3] = resultado.nomes
+   partes[2::3] = SITUACOES[resultado.aprovados.astype(np.intp)].tolist()
+   return "".join(partes)
+
+def blocos_de_linhas(linhas:Iterable[str], alunos_por_bloco:int = ALUNOS_POR_BLOCO)->Iterator[list[str]]:
+   iterador = iter(linhas)
+   while bloco := list(islice(iterador, alunos_por_bloco)):
+      yield bloco
+
+def processa_arquivo(
+   caminho_entrada:str,
+   caminho_saida:str,
+   media_aprovacao:float = 5,
+   casas_decimais:int | None = None,
+   alunos_por_bloco:int = ALUNOS_POR_BLOCO
+)->ResumoVetorizado:
+   """
+   Lê o arquivo de notas em blocos, calcula os resultados de cada bloco de forma vetorizada e escreve o texto do
+   resultado no arquivo de saída.
+
+   Args:
+      caminho_entrada (str): arquivo de notas, uma linha "nome nota1 nota2 ..." por aluno
+      caminho_saida (str): arquivo onde o resultado é escrito
+      media_aprovacao (float): média mínima para aprovação
+      casas_decimais (int | None): casas decimais do arredondamento da média antes da comparação, None não arredonda
+      alunos_por_bloco (int): quantidade de linhas processadas de uma vez
+
+   Return:
+      (ResumoVetorizado): contagens de aprovados, reprovados e linhas com erro
+   """
+   resumo = ResumoVetorizado()
+   with open(caminho_entrada, "r") as entrada, open(caminho_saida, "w", buffering=TAMANHO_BUFFER_ESCRITA) as saida:
+      for linhas in blocos_de_linhas(entrada, alunos_por_bloco):
+         resultado:ResultadoBloco = calcula_resultados(converte_bloco(linhas, resumo), media_aprovacao, casas_decimais)
+         __conta_aprovados(resumo, resultado.aprovados)
+         saida.write(formata_resultados(resultado))
+   return resumo
+
+@dataclass
+class NotasMapeadas():
+   """
+   Notas de uma janela do arquivo aberto com mmap. Os nomes não são copiados nem decodificados: cada aluno guarda só
+   a posição do nome dentro da janela (inicio_nomes e fim_nomes), e as notas são convertidas direto dos bytes para
+   um array de inteiros.
+   """
+   janela:np.ndarray #bytes da janela (uint8), uma view do mmap, sem cópia
+   inicio_nomes:np.ndarray
+   fim_nomes:np.ndarray
+   somas:np.ndarray #soma das notas de cada aluno
+   quantidades:np.ndarray #quantidade de notas de cada aluno
+   linhas_com_erro:int
+
+def converte_janela(janela:np.ndarray)->NotasMapeadas | None:
+   """
+   Acha as palavras de uma janela de linhas completas (bytes) e converte as notas para inteiros dígito por dígito, com
+   operações do NumPy sobre todos os alunos da janela, sem criar uma string por linha ou por nota.
+
+   Args:
+      janela (np.ndarray): bytes (uint8) de linhas completas do arquivo de notas
+
+   Return:
+      (NotasMapeadas | None): nomes (posições), somas e quantidades de notas dos alunos da janela, ou None se alguma
+      nota não for um número inteiro (a janela tem que ser convertida como texto)
+   """
+   #as palavras são os trechos entre bytes <= 32 (espaço, "\n", "\r", tab e outros caracteres de controle): com uma
+   #borda de separadores nas duas pontas, as mudanças entre separador e palavra alternam entre início e fim de palavra
+   separadores:np.ndarray = np.empty(len(janela) + 2, dtype=bool)
+   separadores[0] = separadores[-1] = True
+   np.less_equal(janela, ord(" "), out=separadores[1:-1])
+   mudancas:np.ndarray = np.flatnonzero(separadores[1:] != separadores[:-1])
+   del separadores
+   inicio:np.ndarray = mudancas[0::2]
+   fim:np.ndarray = mudancas[1::2]
+
+   #linha de cada palavra: quebras de linha no espaço antes dela. O espaço quase sempre tem 1 byte, então basta olhar
+   #esse byte. Espaços maiores (linhas em branco, "\r\n", espaços duplos) contam as quebras pelas posições delas.
+   posicao_quebras:np.ndarray = np.flatnonzero(janela == ord("\n"))
+   num_linhas:int = len(posicao_quebras) + int(len(janela) > 0 and janela[-1] != ord("\n"))
+   fim_anterior:np.ndarray = np.empty_like(inicio)
+   fim_anterior[:1] = 0
+   fim_anterior[1:] = fim[:-1]
+   quebras_antes:np.ndarray = (janela[fim_anterior] == ord("\n")).astype(np.int32)
+   espacos_longos:np.ndarray = np.flatnonzero(inicio - fim_anterior != 1)
+   quebras_antes[espacos_longos] = np.searchsorted(posicao_quebras, inicio[espacos_longos]) - np.searchsorted(posicao_quebras, fim_anterior[espacos_longos])
+   eh_nome:np.ndarray = quebras_antes > 0 #primeira palavra de cada linha
+   eh_nome[:1] = True
+   linha_palavras:np.ndarray = np.cumsum(quebras_antes, dtype=np.int32)
+   palavras_por_linha:np.ndarray = np.bincount(linha_palavras, minlength=num_linhas)
+
+   #notas: valor = valor * 10 + dígito, uma passada por posição do dígito (notas de 0 a 10 têm no máximo 2 dígitos)
+   eh_nota:np.ndarray = ~eh_nome
+   inicio_notas:np.ndarray = inicio[eh_nota]
+   digitos_notas:np.ndarray = (fim[eh_nota] - inicio_notas).astype(np.int32)
+   linha_notas:np.ndarray = linha_palavras[eh_nota]
+   max_digitos:int = int(digitos_notas.max()) if len(digitos_notas) > 0 else 0
+   if max_digitos > MAX_DIGITOS_NOTA:
+      return None
+   valores:np.ndarray = janela[inicio_notas].astype(np.int32) - ord("0")
+   invalidas:np.ndarray = (valores < 0) | (valores > 9)
+   for posicao in range(1, max_digitos):
+      ativas:np.ndarray = np.flatnonzero(digitos_notas > posicao)
+      digitos:np.ndarray = janela[inicio_notas[ativas] + posicao].astype(np.int32) - ord("0")
+      invalidas[ativas] |= (digitos < 0) | (digitos > 9)
+      valores[ativas] = valores[ativas] * 10 + digitos
+   if invalidas.any(): #nota com sinal, decimal ou que não é um número
+      return None
+
+   linhas_validas:np.ndarray = palavras_por_linha >= 2 #nome e pelo menos uma nota
+   somas:np.ndarray = np.bincount(linha_notas, weights=valores, minlength=num_linhas) #soma exata, as notas são inteiras
+   nomes:np.ndarray = np.flatnonzero(eh_nome)
+   nomes_validos:np.ndarray = nomes[linhas_validas[linha_palavras[nomes]]]
+   return NotasMapeadas(
+      janela=janela,
+      inicio_nomes=inicio[nomes_validos],
+      fim_nomes=fim[nomes_validos],
+      somas=somas[linhas_validas],
+      quantidades=palavras_por_linha[linhas_validas] - 1,
+      linhas_com_erro=int(num_linhas - linhas_validas.sum())
+   )
+
+def formata_resultados_bytes(notas:NotasMapeadas, aprovados:np.ndarray)->np.ndarray:
+   """
+   Monta os bytes do resultado da janela ("O aluno {nome} foi {situação}\\n" por aluno) direto num array do NumPy: os
+   bytes de cada nome são copiados da janela para a posição dele na saída, sem decodificar o nome.
+
+   Return:
+      (np.ndarray): bytes (uint8) do resultado da janela
+   """
+   PREFIXO:np.ndarray = np.frombuffer(b"O aluno ", dtype=np.uint8)
+   SUFIXOS:list[np.ndarray] = [np.frombuffer(situacao.encode(), dtype=np.uint8) for situacao in SITUACOES] #reprovado, aprovado
+
+   tamanho_nomes:np.ndarray = notas.fim_nomes - notas.inicio_nomes
+   tamanho_sufixos:np.ndarray = np.where(aprovados, len(SUFIXOS[1]), len(SUFIXOS[0]))
+   tamanho_linhas:np.ndarray = len(PREFIXO) + tamanho_nomes + tamanho_sufixos
+   inicio_linhas:np.ndarray = np.cumsum(tamanho_linhas) - tamanho_linhas
+   saida:np.ndarray = np.empty(int(tamanho_linhas.sum()), dtype=np.uint8)
+
+   saida[inicio_linhas[:, None] + np.arange(len(PREFIXO))] = PREFIXO
+   posicao_no_nome:np.ndarray = np.arange(int(tamanho_nomes.sum())) - np.repeat(np.cumsum(tamanho_nomes) - tamanho_nomes, tamanho_nomes)
+   saida[np.repeat(inicio_linhas + len(PREFIXO), tamanho_nomes) + posicao_no_nome] = notas.janela[np.repeat(notas.inicio_nomes, tamanho_nomes) + posicao_no_nome]
+   inicio_sufixos:np.ndarray = inicio_linhas + len(PREFIXO) + tamanho_nomes
+   for aprovado, sufixo in ((False, SUFIXOS[0]), (True, SUFIXOS[1])):
+      alunos:np.ndarray = aprovados == aprovado
+      saida[inicio_sufixos[alunos][:, None] + np.arange(len(sufixo))] = sufixo
+   return saida
+
+def janelas_mmap(dados:mmap.mmap | np.ndarray, tamanho_janela:int = TAMANHO_JANELA_MMAP)->Iterator[np.ndarray]:
+   """
+   Divide o arquivo mapeado em janelas de linhas completas (cada janela termina logo depois de um "\\n"), como views
+   do mmap, sem copiar os bytes.
+   """
+   bytes_arquivo:np.ndarray = np.frombuffer(dados, dtype=np.uint8)
+   inicio:int = 0
+   while inicio < len(bytes_arquivo):
+      fim:int = min(inicio + tamanho_janela, len(bytes_arquivo))
+      if fim < len(bytes_arquivo):
+         quebra:int = dados.find(b"\n", fim - 1)
+         fim = len(bytes_arquivo) if quebra == -1 else quebra + 1
+      yield bytes_arquivo[inicio:fim]
+      inicio = fim
+
+def processa_arquivo_mmap(
+   caminho_entrada:str,
+   caminho_saida:str,
+   media_aprovacao:float = 5,
+   casas_decimais:int | None = None,
+   tamanho_janela:int = TAMANHO_JANELA_MMAP
+)->ResumoVetorizado:
+   """
+   Versão de processa_arquivo que abre o arquivo de notas com mmap e converte os bytes direto para arrays, sem criar
+   strings para as linhas, as notas ou os nomes: o resultado também é montado em bytes. Janelas com alguma nota que
+   não é um número inteiro são processadas como texto, pelo mesmo caminho de processa_arquivo.
+
+   Args:
+      caminho_entrada (str): arquivo de notas, uma linha "nome nota1 nota2 ..." por aluno
+      caminho_saida (str): arquivo onde o resultado é escrito
+      media_aprovacao (float): média mínima para aprovação
+      casas_decimais (int | None): casas decimais do arredondamento da média antes da comparação, None não arredonda
+      tamanho_janela (int): bytes do arquivo processados de uma vez
+
+   Return:
+      (ResumoVetorizado): contagens de aprovados, reprovados e linhas com erro
+   """
+   resumo = ResumoVetorizado()
+   with open(caminho_entrada, "rb") as entrada, open(caminho_saida, "wb") as saida:
+      if os.fstat(entrada.fileno()).st_size == 0: #mmap não aceita arquivos vazios
+         return resumo
+      with mmap.mmap(entrada.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+         for janela in janelas_mmap(dados, tamanho_janela):
+            notas:NotasMapeadas | None = converte_janela(janela)
+            if notas is None: #alguma nota não é inteira, a janela é processada como texto
+               #só "\n" quebra a linha, como no caminho com mmap (o splitlines também quebra em \x0c, \x1c, \x85 e outros)
+               for linhas in blocos_de_linhas(io.StringIO(janela.tobytes().decode("utf-8"), newline="\n")):
+                  resultado:ResultadoBloco = calcula_resultados(converte_bloco(linhas, resumo), media_aprovacao, casas_decimais)
+                  __conta_aprovados(resumo, resultado.aprovados)
+                  saida.write(formata_resultados(resultado).encode("utf-8"))
+            else:
+               aprovados:np.ndarray = __medias(notas.somas, notas.quantidades, casas_decimais) >= media_aprovacao
+               resumo.linhas_com_erro += notas.linhas_com_erro
+               __conta_aprovados(resumo, aprovados)
+               saida.write(formata_resultados_bytes(notas, aprovados))
+            del notas, janela #as views do mmap têm que ser liberadas antes dele ser fechado
+   return resumo
+
+def __conta_aprovados(resumo:ResumoVetorizado, aprovados:np.ndarray)->None:
+   num_aprovados:int = int(aprovados.sum())
+   resumo.aprovados += num_aprovados
+   resumo.reprovados += len(aprovados) - num_aprovados
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Verifica os alunos aprovados de um arquivo de notas grande, de forma vetorizada.")
+   parser.add_argument("entrada", nargs="?", default="notas.in", help="arquivo de notas (padrão: notas.in)")
+   parser.add_argument("saida", nargs="?", default="resultado.txt", help="arquivo do resultado (padrão: resultado.txt)")
+   parser.add_argument("media", nargs="?", type=float, default=None, help="média mínima para aprovação (padrão: a do --script)")
+   parser.add_argument("--script", choices=sorted(REGRAS_SCRIPTS), default="exercicio_arquivos", help="regras de aprovação usadas (média 5 sem arredondamento ou média 7 arredondada para uma casa)")
+   parser.add_argument("--casas-decimais", type=int, default=None, help="casas decimais do arredondamento da média (padrão: a do --script)")
+   argumentos = parser.parse_args()
+
+   media, casas_decimais = REGRAS_SCRIPTS[argumentos.script]
+   if argumentos.media is not None:
+      media = argumentos.media
+   if argumentos.casas_decimais is not None:
+      casas_decimais = argumentos.casas_decimais
+   resumo = processa_arquivo_mmap(os.path.join(os.getcwd(), argumentos.entrada), os.path.join(os.getcwd(), argumentos.saida), media, casas_decimais)
+   print(f"{resumo.aprovados + resumo.reprovados} alunos processados ({resumo.aprovados} aprovados, {resumo.reprovados} reprovados), {resumo.linhas_com_erro} linhas com erro")